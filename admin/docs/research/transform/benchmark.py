@@ -0,0 +1,166 @@
+"""Пропускная способность преобразования строк Postgres в документы ELK.
+
+Строки генерируются в формате запроса FILM_WORK_QUERY ETL (персоны и
+жанры в json_agg) с заданным числом персон на фильм и преобразуются
+тремя способами:
+
+- было: модель ElasticsearchData, персоны перебираются отдельно для
+  каждого из шести полей, затем `model_dump_json()`;
+- стало: `transform_data_for_elk` - раскладка персон по ролям за один
+  проход и сериализация orjson в байты;
+- strict: то же с проверкой документа схемой (ETL_STRICT_VALIDATION).
+
+Запуск из каталога `admin/etl`:
+
+    python ../docs/research/transform/benchmark.py --persons 10 100 300
+"""
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parents[3].joinpath('etl')))
+
+import orjson  # noqa: E402
+from config import app_settings  # noqa: E402
+from schema import ElasticsearchData  # noqa: E402
+from utils import transform_data_for_elk  # noqa: E402
+
+ROLES = ('actor',) * 8 + ('director', 'writer')
+WORDS = (
+    'космос звезда путешествие война мир любовь герой корабль планета '
+    'империя повстанцы пилот робот галактика тайна город'
+).split()
+GENRES = [
+    {'genre_id': str(uuid.uuid4()), 'genre_name': name}
+    for name in ('Action', 'Adventure', 'Fantasy', 'Sci-Fi', 'Drama')
+]
+
+
+def make_row(persons: int) -> dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'title': ' '.join(random.choices(WORDS, k=3)).title(),
+        'description': ' '.join(random.choices(WORDS, k=40)),
+        'rating': round(random.uniform(1, 10), 1),
+        'type': 'movie',
+        'persons': [
+            {
+                'person_role': random.choice(ROLES),
+                'person_id': str(uuid.uuid4()),
+                'person_name': ' '.join(random.choices(WORDS, k=2)).title(),
+            }
+            for _ in range(persons)
+        ],
+        'genres': random.sample(GENRES, k=random.randint(1, 3)),
+    }
+
+
+def transform_before(rows: list) -> list:
+    documents = []
+    for row in rows:
+        document = ElasticsearchData(
+            id=row.get('id'),
+            imdb_rating=row.get('rating'),
+            type=row.get('type'),
+            genre=[
+                genre.get('genre_name') for genre in row.get('genres')
+            ],
+            genres=[genre for genre in row.get('genres')],
+            title=row.get('title'),
+            description=row.get('description'),
+            director=[
+                person.get('person_name') for person in row.get('persons')
+                if person.get('person_role') == 'director'
+            ],
+            directors=[
+                person for person in row.get('persons')
+                if person.get('person_role') == 'director'
+            ],
+            actors_names=[
+                person.get('person_name') for person in row.get('persons')
+                if person.get('person_role') == 'actor'
+            ],
+            writers_names=[
+                person.get('person_name') for person in row.get('persons')
+                if person.get('person_role') == 'writer'
+            ],
+            actors=[
+                person for person in row.get('persons')
+                if person.get('person_role') == 'actor'
+            ],
+            writers=[
+                person for person in row.get('persons')
+                if person.get('person_role') == 'writer'
+            ],
+        )
+        documents.append((document.id, document.model_dump_json()))
+    return documents
+
+
+def transform_strict(rows: list) -> list:
+    app_settings.etl_strict_validation = True
+    try:
+        return transform_data_for_elk(rows)
+    finally:
+        app_settings.etl_strict_validation = False
+
+
+def measure(transform, batches: list[list]) -> float:
+    started = time.perf_counter()
+    for rows in batches:
+        transform(rows)
+    elapsed = time.perf_counter() - started
+    return sum(len(rows) for rows in batches) / elapsed
+
+
+def main(persons_counts: list[int], films: int, batch_size: int) -> None:
+    print(
+        f"{'персон в фильме':>16} {'было, фильм/с':>14} "
+        f"{'стало, фильм/с':>15} {'strict, фильм/с':>16}"
+    )
+    for persons in persons_counts:
+        rows = [make_row(persons) for _ in range(films)]
+        batches = [
+            rows[start:start + batch_size]
+            for start in range(0, films, batch_size)
+        ]
+        # Все способы должны давать одинаковые документы
+        before, after, strict = (
+            transform(batches[0])
+            for transform in (
+                transform_before, transform_data_for_elk, transform_strict
+            )
+        )
+        assert [json.loads(source) for _, source in before] == [
+            orjson.loads(source) for _, source in after
+        ]
+        assert after == strict
+
+        speed = [
+            measure(transform, batches)
+            for transform in (
+                transform_before, transform_data_for_elk, transform_strict
+            )
+        ]
+        print(
+            f'{persons:>16} {speed[0]:>14.0f} '
+            f'{speed[1]:>15.0f} {speed[2]:>16.0f}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--persons', type=int, nargs='+', default=[10, 100, 300]
+    )
+    parser.add_argument('--films', type=int, default=3000)
+    parser.add_argument(
+        '--batch-size', type=int, default=app_settings.batch_size
+    )
+    args = parser.parse_args()
+    random.seed(0)
+    main(args.persons, args.films, args.batch_size)
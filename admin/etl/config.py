@@ -23,6 +23,15 @@ class Settings(BaseSettings):
         f'{int(os.getenv("ELK_PORT", "9200"))}'
     )
     elk_index_name: str = 'movies'
+    redis_dsn: str = (
+        'redis://'
+        f'{os.getenv("REDIS_HOST", "127.0.0.1")}:'
+        f'{int(os.getenv("REDIS_PORT", "6379"))}/'
+        f'{int(os.getenv("REDIS_DB", "0"))}'
+    )
+    redis_timeout: int = 5
+    redis_generation_key: str = 'generation:{index}'
+    redis_invalidation_channel: str = 'cache-invalidation'
     elk_index_settings: dict = {
         'refresh_interval': '1s',
         'analysis': {
@@ -46,6 +55,11 @@ class Settings(BaseSettings):
                 'russian_stemmer': {
                     'type': 'stemmer',
                     'language': 'russian'
+                },
+                'autocomplete_filter': {
+                    'type': 'edge_ngram',
+                    'min_gram': 1,
+                    'max_gram': 20
                 }
             },
             'analyzer': {
@@ -59,6 +73,19 @@ class Settings(BaseSettings):
                         'russian_stop',
                         'russian_stemmer'
                     ]
+                },
+                'autocomplete': {
+                    'tokenizer': 'standard',
+                    'filter': [
+                        'lowercase',
+                        'autocomplete_filter'
+                    ]
+                },
+                'autocomplete_search': {
+                    'tokenizer': 'standard',
+                    'filter': [
+                        'lowercase'
+                    ]
                 }
             }
         }
@@ -72,6 +99,9 @@ class Settings(BaseSettings):
             'imdb_rating': {
                 'type': 'float'
             },
+            'type': {
+                'type': 'keyword'
+            },
             'genre': {
                 'type': 'keyword'
             },
@@ -94,6 +124,11 @@ class Settings(BaseSettings):
                 'fields': {
                     'raw': {
                         'type': 'keyword'
+                    },
+                    'suggest': {
+                        'type': 'text',
+                        'analyzer': 'autocomplete',
+                        'search_analyzer': 'autocomplete_search'
                     }
                 }
             },
@@ -112,7 +147,7 @@ class Settings(BaseSettings):
                     'id': {
                         'type': 'keyword'
                     },
-                    'name': {
+                    'full_name': {
                         'type': 'text',
                         'analyzer': 'ru_en'
                     }
@@ -133,7 +168,7 @@ class Settings(BaseSettings):
                     'id': {
                         'type': 'keyword'
                     },
-                    'name': {
+                    'full_name': {
                         'type': 'text',
                         'analyzer': 'ru_en'
                     }
@@ -146,7 +181,7 @@ class Settings(BaseSettings):
                     'id': {
                         'type': 'keyword'
                     },
-                    'name': {
+                    'full_name': {
                         'type': 'text',
                         'analyzer': 'ru_en'
                     }
@@ -155,9 +190,87 @@ class Settings(BaseSettings):
         }
     }
 
+    elk_persons_index_name: str = 'persons'
+    elk_persons_index_mapping: dict = {
+        'dynamic': 'strict',
+        'properties': {
+            'id': {
+                'type': 'keyword'
+            },
+            'full_name': {
+                'type': 'text',
+                'analyzer': 'ru_en',
+                'fields': {
+                    'raw': {
+                        'type': 'keyword'
+                    },
+                    'suggest': {
+                        'type': 'text',
+                        'analyzer': 'autocomplete',
+                        'search_analyzer': 'autocomplete_search'
+                    }
+                }
+            },
+            'films': {
+                'type': 'object',
+                'dynamic': 'strict',
+                'properties': {
+                    'id': {
+                        'type': 'keyword'
+                    },
+                    'roles': {
+                        'type': 'keyword'
+                    }
+                }
+            }
+        }
+    }
+
+    elk_genres_index_name: str = 'genres'
+    elk_genres_index_mapping: dict = {
+        'dynamic': 'strict',
+        'properties': {
+            'id': {
+                'type': 'keyword'
+            },
+            'name': {
+                'type': 'text',
+                'analyzer': 'ru_en',
+                'fields': {
+                    'raw': {
+                        'type': 'keyword'
+                    }
+                }
+            }
+        }
+    }
+
     batch_size: int = 300
+    # Проверка документов схемами schema.py перед загрузкой (отладка)
+    etl_strict_validation: bool = False
+    etl_workers: int = 1
+    elk_request_timeout: int = 30
+    elk_max_retries: int = 3
+    elk_bulk_chunk_size: int = 500
+    elk_bulk_chunk_bytes: int = 10 * 1024 * 1024
+    elk_bulk_threads: int = 4
+    elk_number_of_replicas: int = 1
+    elk_forcemerge_timeout: int = 3600
+    # Сколько прежних версий индекса оставлять после переиндексации
+    elk_index_versions_kept: int = 1
     sleep_time: int = 10
-    state_key: str = 'modified'
+    # poll - синхронизация раз в sleep_time секунд, notify - по уведомлениям
+    # триггеров Postgres и не реже раза в notify_timeout секунд
+    etl_source: str = 'poll'
+    notify_channel: str = 'content_changes'
+    notify_timeout: int = 60
+    # Сколько секунд после начала транзакции изменение может оставаться
+    # незафиксированным: позиция выгрузки отстает на это время, и
+    # изменения последних etl_commit_lag секунд перечитываются
+    etl_commit_lag: int = 60
+    film_work_state_key: str = 'modified:{source}'
+    persons_state_key: str = 'persons_modified:{source}'
+    genres_state_key: str = 'genres_modified:{source}'
 
     class Config:
         env_file = './../.env'
@@ -1,6 +1,6 @@
 from enum import Enum
 
-QUERY = '''
+FILM_WORK_QUERY = '''
 SELECT
    film_work.id,
    film_work.title,
@@ -33,16 +33,126 @@ LEFT JOIN content.person_film_work ON person_film_work.film_work_id = film_work.
 LEFT JOIN content.person ON person.id = person_film_work.person_id
 LEFT JOIN content.genre_film_work ON genre_film_work.film_work_id = film_work.id
 LEFT JOIN content.genre ON genre.id = genre_film_work.genre_id
-WHERE film_work.modified > %s OR person.modified > %s OR genre.modified > %s
+WHERE film_work.id = ANY(%s::uuid[])
 GROUP BY film_work.id
-ORDER BY film_work.modified DESC
+'''
+
+# Измененные записи сущности по индексу на ({column}, id): keyset-пагинация
+# по возрастанию, продолжается с последней выгруженной записи
+PRODUCER_QUERY = '''
+SELECT id, {column} AS modified
+FROM content.{table}
+WHERE ({column}, id) > (%s, %s)
+ORDER BY {column}, id
+'''
+
+# Доля записей воркера: hashtext(id) без знака по модулю числа воркеров
+PARTITION_FILTER = '(hashtext({column}::text) & 2147483647) %% %s = %s'
+
+# Запросы идентификаторов документов партиции, затронутых изменением
+# записей таблицы-источника
+
+FILM_WORK_IDS_QUERY = f'''
+SELECT id
+FROM content.film_work
+WHERE id = ANY(%s::uuid[])
+  AND {PARTITION_FILTER.format(column='id')}
+'''
+
+PERSON_FILM_WORK_IDS_QUERY = f'''
+SELECT DISTINCT film_work_id AS id
+FROM content.person_film_work
+WHERE person_id = ANY(%s::uuid[])
+  AND {PARTITION_FILTER.format(column='film_work_id')}
+'''
+
+GENRE_FILM_WORK_IDS_QUERY = f'''
+SELECT DISTINCT film_work_id AS id
+FROM content.genre_film_work
+WHERE genre_id = ANY(%s::uuid[])
+  AND {PARTITION_FILTER.format(column='film_work_id')}
+'''
+
+PERSON_IDS_QUERY = f'''
+SELECT id
+FROM content.person
+WHERE id = ANY(%s::uuid[])
+  AND {PARTITION_FILTER.format(column='id')}
+'''
+
+GENRE_IDS_QUERY = f'''
+SELECT id
+FROM content.genre
+WHERE id = ANY(%s::uuid[])
+  AND {PARTITION_FILTER.format(column='id')}
+'''
+
+# Источник изменений (имя в ключе состояния) -> таблица, поле времени
+# изменения и запрос документов, которые эти изменения затрагивают.
+# Первый источник - основной: полная выгрузка идет только по нему
+FILM_WORK_PRODUCERS = {
+    'film_work': ('film_work', 'modified', FILM_WORK_IDS_QUERY),
+    'person': ('person', 'modified', PERSON_FILM_WORK_IDS_QUERY),
+    'genre': ('genre', 'modified', GENRE_FILM_WORK_IDS_QUERY),
+}
+
+# Связи персоны с фильмами меняют films_modified (триггер на
+# person_film_work), правка самого фильма документ персоны не меняет
+PERSON_PRODUCERS = {
+    'person': ('person', 'modified', PERSON_IDS_QUERY),
+    'person_films': ('person', 'films_modified', PERSON_IDS_QUERY),
+}
+
+GENRE_PRODUCERS = {
+    'genre': ('genre', 'modified', GENRE_IDS_QUERY),
+}
+
+PERSONS_QUERY = '''
+SELECT
+   person.id,
+   person.full_name,
+   COALESCE (
+       json_agg(
+           DISTINCT jsonb_build_object(
+               'film_id', person_film_work.film_work_id,
+               'role', person_film_work.role
+           )
+       ) FILTER (WHERE person_film_work.film_work_id is not null),
+       '[]'
+   ) as films
+FROM content.person
+LEFT JOIN content.person_film_work ON person_film_work.person_id = person.id
+WHERE person.id = ANY(%s::uuid[])
+GROUP BY person.id
+'''
+
+GENRES_QUERY = '''
+SELECT id, name
+FROM content.genre
+WHERE id = ANY(%s::uuid[])
 '''
 
 
 class Messages(str, Enum):
     ELK_INDEX_CREATE = 'Индекс ELK создан: %s'
-    CURRENT_STATE = 'Получена последняя дата синхронизации: %s'
-    ELK_DOWNLOAD = 'Загружено в ELK: %s'
+    ELK_INDEX_OUTDATED = 'Маппинг индекса ELK %s изменился, переиндексация'
+    ELK_INDEX_LOADED = 'Индекс ELK %s заполнен, слияние сегментов...'
+    ELK_ALIAS_SWAP = 'Алиас %s переключен на %s, прежние индексы: %s'
+    ELK_INDEX_DELETE = 'Индексы ELK удалены: %s'
+    CURRENT_STATE = 'Получена последняя дата синхронизации %s: %s'
+    CHANGES_LOADED = 'Изменено %s: %s, загружено в %s: %s'
+    ELK_DOWNLOAD = (
+        'Загружено в ELK %s: %s, отклонено: %s, с временными ошибками: %s'
+    )
+    ELK_DOCUMENT_ERROR = 'Документ %s не загружен в ELK, повтор: %s'
+    ELK_DOCUMENT_REJECTED = 'Документ %s отклонен ELK и пропущен: %s'
+    INDEX_GENERATION = 'Поколение индекса %s: %s'
+    INDEX_GENERATION_ERROR = 'Поколение индекса %s не обновлено: %s'
     ELK_SLEEP = 'Отдыхаем %s ceкунд...'
+    CONTENT_WAIT = 'Ждем изменений в Postgres не дольше %s секунд...'
+    CONTENT_CHANGED = 'Изменены таблицы Postgres: %s'
+    LISTEN_ERROR = 'Потеряно соединение для LISTEN: %s'
     ELK_SLEEP_OFFLINE = 'ELK не доступен'
+    WORKER_START = 'Запущен воркер партиции %s'
+    WORKER_EXITED = 'Воркер партиции %s завершился с кодом %s, перезапуск'
     BACKOFF_MESSAGE = 'Перехвачена ошибка (ожидание %sс.): %s'
@@ -1,39 +1,99 @@
-import contextlib
 import logging
-from datetime import datetime
+import multiprocessing
+import signal
+import sys
 from time import sleep
 
-import psycopg2
 from config import app_settings
-from constants import QUERY, Messages
-from psycopg2.extras import RealDictCursor
-from utils import (JsonFileStorage, State, create_elk_index, download_to_elk,
-                   transform_data_for_elk)
+from constants import Messages
+from pipeline import ENTITIES, Partition, load
+from reindex import reindex
+from utils import (ChangeListener, JsonFileStorage, State, backoff,
+                   bump_index_generation, create_elk_index,
+                   outdated_elk_indexes, postgres_connection, setup_logging)
 
-if __name__ == '__main__':
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
+logger = logging.getLogger(__name__)
+
+
+@backoff()
+def sync(storage: JsonFileStorage, partition: Partition) -> None:
+    """
+    Цикл синхронизации Postgres -> ELK для партиции.
+
+    Состояние сохраняется после выгрузки каждой пачки изменений, поэтому
+    при ошибке цикл повторяется с последней сохраненной позиции.
+    """
+    state = State(storage=storage)
+    with postgres_connection() as conn:
+        for entity in ENTITIES.values():
+            if load(conn, state, partition, entity):
+                bump_index_generation(entity.index_name)
+
+
+def run(partition: Partition) -> None:
+    """
+    Воркер: синхронизирует свою партицию раз в sleep_time секунд или,
+    в режиме notify, по уведомлениям триггеров Postgres.
+    """
+    setup_logging()
+    logger.info(Messages.WORKER_START.value, partition)
+    storage = JsonFileStorage(
+        file_path=partition.storage_file(app_settings.elk_storage_file)
     )
-    logger = logging.getLogger(__name__)
-    storage = JsonFileStorage(file_path=app_settings.elk_storage_file)
-    create_elk_index()
+    listener = None
+    if app_settings.etl_source == 'notify':
+        # Подписка до первой синхронизации: изменения, сделанные во время
+        # нее, разбудят следующий цикл
+        listener = ChangeListener(app_settings.notify_channel)
+        listener.connect()
     while True:
-        state = State(storage=storage)
-        with (
-            contextlib.closing(
-                psycopg2.connect(
-                    **app_settings.postgres_dsn, cursor_factory=RealDictCursor
+        sync(storage=storage, partition=partition)
+        if listener is not None:
+            logger.info(
+                Messages.CONTENT_WAIT.value, app_settings.notify_timeout
+            )
+            listener.wait(app_settings.notify_timeout)
+        else:
+            logger.info(Messages.ELK_SLEEP.value, app_settings.sleep_time)
+            sleep(app_settings.sleep_time)
+
+
+def coordinate(workers: int) -> None:
+    """
+    Координатор: запускает по процессу на партицию и перезапускает
+    завершившиеся. Процессы стартуют через spawn, чтобы не наследовать
+    соединения с ELK и Postgres.
+    """
+    # По SIGTERM выходим штатно: daemon-процессы воркеров завершаются
+    # вместе с координатором
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+    while True:
+        for number in range(workers):
+            process = processes.get(number)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.error(
+                    Messages.WORKER_EXITED.value, number, process.exitcode
                 )
-            ) as conn,
-            conn.cursor() as cursor
-        ):
-            modified = state.get_state(app_settings.state_key)
-            logger.info(Messages.CURRENT_STATE.value, modified)
-            params = modified or datetime.min
-            cursor.execute(QUERY, (params, ) * 3)
-            while results := cursor.fetchmany(app_settings.batch_size):
-                download_to_elk(rows=transform_data_for_elk(rows=results))
-                state.set_state(app_settings.state_key, str(datetime.now()))
-        logger.info(Messages.ELK_SLEEP.value, app_settings.sleep_time)
+            processes[number] = context.Process(
+                target=run,
+                args=(Partition(number, workers), ),
+                daemon=True
+            )
+            processes[number].start()
         sleep(app_settings.sleep_time)
+
+
+if __name__ == '__main__':
+    setup_logging()
+    create_elk_index()
+    for alias in outdated_elk_indexes():
+        logger.info(Messages.ELK_INDEX_OUTDATED.value, alias)
+        reindex(alias, app_settings.elk_index_versions_kept)
+    if app_settings.etl_workers > 1:
+        coordinate(app_settings.etl_workers)
+    else:
+        run(Partition())
@@ -0,0 +1,247 @@
+"""
+Инкрементальная выгрузка индексов: producer -> fan-out -> enricher.
+
+Для каждого индекса (фильмы, персоны, жанры) producer каждой
+таблицы-источника находит измененные записи по индексу на
+(modified, id). Fan-out переводит их в идентификаторы затронутых
+документов, enricher собирает полные данные только этих документов
+пачками. Стоимость цикла зависит от объема изменений, а не от размера
+каталога.
+
+Документы делятся на партиции по hashtext(id): каждый воркер выгружает
+только свою партицию и хранит по ней отдельное состояние.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+from uuid import UUID
+
+from config import app_settings
+from constants import (FILM_WORK_PRODUCERS, FILM_WORK_QUERY, GENRE_PRODUCERS,
+                       GENRES_QUERY, PERSON_PRODUCERS, PERSONS_QUERY,
+                       PRODUCER_QUERY, Messages)
+from utils import (State, download_to_elk, transform_data_for_elk,
+                   transform_genres_for_elk, transform_persons_for_elk)
+
+logger = logging.getLogger(__name__)
+
+# Позиция до первой записи любой таблицы
+START_POSITION = {'modified': str(datetime.min), 'id': str(UUID(int=0))}
+
+
+class Partition(NamedTuple):
+    """
+    Доля документов одного воркера: записи, у которых
+    hashtext(id) по модулю total равен number.
+    """
+    number: int = 0
+    total: int = 1
+
+    @property
+    def suffix(self) -> str:
+        return '' if self.total == 1 else f'.{self.number}-of-{self.total}'
+
+    def state_key(self, key: str) -> str:
+        """Ключ состояния партиции."""
+        return f'{key}{self.suffix}'
+
+    def storage_file(self, file_path: str) -> str:
+        """Файл состояния партиции: у каждого воркера свой."""
+        root, ext = os.path.splitext(file_path)
+        return f'{root}{self.suffix}{ext}'
+
+
+def position(row: dict) -> dict:
+    """Позиция записи (modified, id) для сохранения в состоянии."""
+    return {'modified': str(row['modified']), 'id': str(row['id'])}
+
+
+def watermark(row: dict, horizon: datetime) -> dict:
+    """
+    Позиция, до которой выгрузка считается завершенной после пачки,
+    заканчивающейся записью row.
+
+    modified выставляется до фиксации транзакции (auto_now Django,
+    now() в триггерах), поэтому запись с меньшим modified может стать
+    видна уже после выгрузки записи с большим. Позиция не сдвигается
+    дальше horizon, и следующий проход перечитывает изменения последних
+    etl_commit_lag секунд.
+    """
+    if row['modified'] < horizon:
+        return position(row)
+    return START_POSITION | {'modified': str(horizon)}
+
+
+def stream(connection, name: str, query: str, params: tuple) -> Iterator[list]:
+    """
+    Пачки строк запроса по batch_size через серверный (именованный)
+    курсор: в памяти ETL одновременно не больше одной пачки, сколько бы
+    строк ни вернул запрос.
+    """
+    with connection.cursor(name=name) as cursor:
+        cursor.itersize = app_settings.batch_size
+        cursor.execute(query, params)
+        while rows := list(islice(cursor, app_settings.batch_size)):
+            yield rows
+
+
+def produce(
+    connection, table: str, column: str, last: Optional[dict]
+) -> Iterator[list]:
+    """
+    Пачки измененных записей таблицы по возрастанию (column, id),
+    начиная после позиции last. Время изменения возвращается в поле
+    modified.
+    """
+    last = last or START_POSITION
+    return stream(
+        connection,
+        f'produce_{table}_{column}',
+        PRODUCER_QUERY.format(table=table, column=column),
+        (last['modified'], last['id'])
+    )
+
+
+def fan_out(
+    connection, query: str, ids: list[str], partition: Partition
+) -> Iterator[list[str]]:
+    """
+    Пачки идентификаторов документов партиции, затронутых изменением
+    записей ids.
+    """
+    params = (ids, partition.total, partition.number)
+    for rows in stream(connection, 'fan_out', query, params):
+        yield [row['id'] for row in rows]
+
+
+def enrich(
+    connection, query: str, ids: Iterable[list[str]]
+) -> Iterator[list]:
+    """Полные данные документов для каждой пачки идентификаторов."""
+    with connection.cursor() as cursor:
+        for batch in ids:
+            cursor.execute(query, (batch, ))
+            yield cursor.fetchall()
+
+
+def db_now(connection) -> datetime:
+    """Текущее время Postgres (начало транзакции)."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT now() AS now')
+        return cursor.fetchone()['now']
+
+
+class Entity(NamedTuple):
+    """Индекс ELK и источники изменений его документов в Postgres."""
+    index_name: str
+    # Шаблон ключа состояния producer с {source}
+    state_key: str
+    # Источник изменений -> (таблица, поле времени изменения, запрос
+    # затронутых документов)
+    producers: dict[str, tuple[str, str, str]]
+    # Полные данные документов по идентификаторам
+    query: str
+    transform: Callable[[list], list[tuple[str, bytes]]]
+
+
+ENTITIES = {
+    entity.index_name: entity
+    for entity in (
+        Entity(
+            app_settings.elk_index_name,
+            app_settings.film_work_state_key,
+            FILM_WORK_PRODUCERS,
+            FILM_WORK_QUERY,
+            transform_data_for_elk,
+        ),
+        Entity(
+            app_settings.elk_persons_index_name,
+            app_settings.persons_state_key,
+            PERSON_PRODUCERS,
+            PERSONS_QUERY,
+            transform_persons_for_elk,
+        ),
+        Entity(
+            app_settings.elk_genres_index_name,
+            app_settings.genres_state_key,
+            GENRE_PRODUCERS,
+            GENRES_QUERY,
+            transform_genres_for_elk,
+        ),
+    )
+}
+
+
+def load(
+    connection,
+    state: State,
+    partition: Partition,
+    entity: Entity,
+    index_name: Optional[str] = None
+) -> bool:
+    """
+    Выгрузка изменений документов сущности в партиции в индекс
+    index_name (по умолчанию - в индекс сущности). Без сохраненной
+    позиции основного (первого) producer выгружаются все документы.
+
+    Позиция каждого producer сохраняется в state после выгрузки пачки,
+    но не дальше момента за etl_commit_lag секунд до начала прохода
+    (см. watermark); если часть документов не загрузилась,
+    download_to_elk поднимает BulkLoadError, и позиция остается на
+    предыдущей пачке.
+    Возвращает True, если загружен хотя бы один документ.
+    """
+    index_name = index_name or entity.index_name
+
+    def state_key(source: str) -> str:
+        return partition.state_key(entity.state_key.format(source=source))
+
+    primary, *secondary = entity.producers
+    if state.get_state(state_key(primary)) is None:
+        # Полная выгрузка: основной producer проходит все документы, а
+        # остальные повторили бы их (фильм - по разу на каждую персону
+        # и жанр), поэтому начинают с изменений после ее начала
+        started = db_now(connection) - timedelta(
+            seconds=app_settings.etl_commit_lag
+        )
+        for source in secondary:
+            state.set_state(
+                state_key(source), START_POSITION | {'modified': str(started)}
+            )
+
+    loaded = False
+    for source, (table, column, fan_out_query) in entity.producers.items():
+        last = state.get_state(state_key(source))
+        logger.info(Messages.CURRENT_STATE.value, state_key(source), last)
+        horizon = db_now(connection) - timedelta(
+            seconds=app_settings.etl_commit_lag
+        )
+        for changes in produce(connection, table, column, last):
+            ids = fan_out(
+                connection,
+                fan_out_query,
+                [row['id'] for row in changes],
+                partition
+            )
+            # Документы всех затронутых записей идут в ELK одним
+            # потоком, пока enricher читает следующие пачки
+            count = download_to_elk(
+                rows=(
+                    document
+                    for results in enrich(connection, entity.query, ids)
+                    for document in entity.transform(results)
+                ),
+                index_name=index_name
+            )
+            logger.info(
+                Messages.CHANGES_LOADED.value,
+                source, len(changes), index_name, count
+            )
+            if count:
+                loaded = True
+            state.set_state(
+                state_key(source), watermark(changes[-1], horizon)
+            )
+    return loaded
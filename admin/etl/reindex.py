@@ -0,0 +1,207 @@
+"""
+Переиндексация без простоя (blue/green).
+
+Рядом с текущим индексом создается новая версия с актуальными
+настройками и маппингом, на время заливки без обновления поиска
+(refresh_interval: -1) и без реплик. Индекс заполняется из Postgres,
+затем настройки восстанавливаются, сегменты сливаются, и алиас, который
+читают api и ETL, атомарно переключается на новую версию. Изменения,
+выгруженные основным ETL в прежний индекс за время заливки, догружаются
+в новый до и после переключения. Заливка и догрузки делятся на
+etl_workers партиций, как и основной ETL.
+
+ETL при запуске сам переиндексирует алиасы, индексы которых созданы
+с другими настройками или маппингом (utils.outdated_elk_indexes).
+Ручной запуск из каталога `admin/etl`:
+
+    python reindex.py movies persons genres [--keep N]
+
+После переключения алиаса остаются elk_index_versions_kept последних
+прежних версий (для отката), более старые удаляются.
+"""
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import app_settings
+from constants import Messages
+from elasticsearch import Elasticsearch
+from pipeline import ENTITIES, START_POSITION, Partition, db_now, load
+from utils import (JsonFileStorage, State, bump_index_generation,
+                   get_elk_client, get_elk_indexes, postgres_connection,
+                   setup_logging, versioned_index_name)
+
+logger = logging.getLogger(__name__)
+
+# Настройки индекса на время заливки
+BULK_LOAD_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0}
+
+
+def rewind(
+    state: State, alias: str, since: datetime, partition: Partition
+) -> None:
+    """
+    Перевод позиций выгрузки индекса в партиции на момент since с запасом
+    etl_commit_lag секунд на изменения, зафиксированные позже.
+    """
+    entity = ENTITIES[alias]
+    since -= timedelta(seconds=app_settings.etl_commit_lag)
+    for source in entity.producers:
+        state.set_state(
+            partition.state_key(entity.state_key.format(source=source)),
+            START_POSITION | {'modified': str(since)}
+        )
+
+
+def catch_up_partition(
+    storage_file: str,
+    alias: str,
+    index_name: str,
+    since: Optional[datetime],
+    partition: Partition
+) -> None:
+    """Выгрузка партиции в index_name, выполняется в процессе воркера."""
+    setup_logging()
+    state = State(
+        storage=JsonFileStorage(
+            file_path=partition.storage_file(storage_file)
+        )
+    )
+    if since is not None:
+        rewind(state, alias, since, partition)
+    with postgres_connection() as conn:
+        load(conn, state, partition, ENTITIES[alias], index_name)
+
+
+def catch_up(
+    storage_file: str,
+    alias: str,
+    index_name: str,
+    since: Optional[datetime]
+) -> datetime:
+    """
+    Выгрузка в index_name всего, что изменилось после since (без since -
+    с позиций в storage_file). Документы делятся на etl_workers партиций,
+    как в основном ETL, и каждая выгружается своим процессом со своим
+    файлом состояния. Возвращает время начала выгрузки для следующей
+    догрузки.
+    """
+    with postgres_connection() as conn:
+        started = db_now(conn)
+    workers = app_settings.etl_workers
+    arguments = [
+        (storage_file, alias, index_name, since, Partition(number, workers))
+        for number in range(workers)
+    ]
+    if workers == 1:
+        catch_up_partition(*arguments[0])
+    else:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers) as pool:
+            pool.starmap(catch_up_partition, arguments)
+    return started
+
+
+def swap_alias(client: Elasticsearch, alias: str, index_name: str) -> list:
+    """
+    Атомарное переключение алиаса на index_name. Индекс, созданный до
+    перехода на алиасы под тем же именем, удаляется в той же операции.
+    Возвращает прежние индексы алиаса.
+    """
+    actions = [{'add': {'index': index_name, 'alias': alias}}]
+    if client.indices.exists_alias(name=alias):
+        old_indexes = list(client.indices.get_alias(name=alias))
+        actions = [
+            {'remove': {'index': old_index, 'alias': alias}}
+            for old_index in old_indexes
+        ] + actions
+    else:
+        old_indexes = []
+        if client.indices.exists(index=alias):
+            actions.insert(0, {'remove_index': {'index': alias}})
+    client.indices.update_aliases(actions=actions)
+    logger.info(Messages.ELK_ALIAS_SWAP.value, alias, index_name, old_indexes)
+    return old_indexes
+
+
+def prune_versions(client: Elasticsearch, alias: str, keep: int) -> None:
+    """
+    Удаление прежних версий индекса алиаса, кроме keep последних.
+    Индексы, на которые указывает алиас, не удаляются.
+    """
+    version = re.compile(rf'{re.escape(alias)}_\d{{14}}')
+    old_indexes = sorted(
+        (
+            index_name
+            for index_name, info in client.indices.get_alias(
+                index=f'{alias}_*'
+            ).items()
+            if version.fullmatch(index_name)
+            and alias not in info['aliases']
+        ),
+        reverse=True
+    )[keep:]
+    if old_indexes:
+        client.indices.delete(index=old_indexes)
+        logger.info(Messages.ELK_INDEX_DELETE.value, old_indexes)
+
+
+def reindex(alias: str, keep: int) -> None:
+    client = get_elk_client()
+    index_name = versioned_index_name(alias)
+    client.indices.create(
+        index=index_name,
+        settings=app_settings.elk_index_settings | BULK_LOAD_SETTINGS,
+        mappings=get_elk_indexes()[alias]
+    )
+    logger.info(Messages.ELK_INDEX_CREATE.value, index_name)
+
+    # Позиции заливки хранятся отдельно от позиций основного ETL
+    storage_file = f'{index_name}.json'
+    # Состояние новое: заливка всего индекса с начальных позиций
+    started = catch_up(storage_file, alias, index_name, None)
+
+    logger.info(Messages.ELK_INDEX_LOADED.value, index_name)
+    client.indices.put_settings(
+        index=index_name,
+        settings={
+            'refresh_interval': (
+                app_settings.elk_index_settings['refresh_interval']
+            ),
+            'number_of_replicas': app_settings.elk_number_of_replicas,
+        }
+    )
+    client.options(
+        request_timeout=app_settings.elk_forcemerge_timeout
+    ).indices.forcemerge(index=index_name, max_num_segments=1)
+    client.indices.refresh(index=index_name)
+
+    started = catch_up(storage_file, alias, index_name, started)
+    swap_alias(client, alias, index_name)
+    catch_up(storage_file, alias, alias, started)
+    bump_index_generation(alias)
+    for number in range(app_settings.etl_workers):
+        partition = Partition(number, app_settings.etl_workers)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partition.storage_file(storage_file))
+    prune_versions(client, alias, keep)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('aliases', nargs='+', choices=list(ENTITIES))
+    parser.add_argument(
+        '--keep',
+        type=int,
+        default=app_settings.elk_index_versions_kept,
+        help='сколько прежних версий индекса оставить после переключения'
+    )
+    args = parser.parse_args()
+    setup_logging()
+    for alias in args.aliases:
+        reindex(alias, args.keep)
@@ -1,14 +1,18 @@
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Person(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     id: str = Field(alias='person_id')
-    name: str = Field(alias='person_name')
+    full_name: str = Field(alias='person_name')
 
 
 class Genre(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     id: str = Field(alias='genre_id')
     name: str = Field(alias='genre_name')
 
@@ -16,6 +20,7 @@ class Genre(BaseModel):
 class ElasticsearchData(BaseModel):
     id: str
     imdb_rating: Optional[float]
+    type: str
     genre: list[str]
     genres: list[Genre]
     title: str
@@ -26,3 +31,19 @@ class ElasticsearchData(BaseModel):
     writers_names: list[str]
     actors: list[Person]
     writers: list[Person]
+
+
+class PersonFilm(BaseModel):
+    id: str
+    roles: list[str]
+
+
+class ElasticsearchPersonData(BaseModel):
+    id: str
+    full_name: str
+    films: list[PersonFilm]
+
+
+class ElasticsearchGenreData(BaseModel):
+    id: str
+    name: str
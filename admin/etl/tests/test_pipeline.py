@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import pipeline
+from config import app_settings
+from pipeline import Entity, Partition, load
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+FAN_OUT_QUERY = 'fan out'
+PERSON_FAN_OUT_QUERY = 'person fan out'
+ENRICH_QUERY = 'enrich'
+
+
+def parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class FakePostgres:
+    """
+    Таблицы в памяти: producer-запрос выполняется как keyset по
+    (modified, id), fan-out персон возвращает фильмы из links, остальные
+    fan-out и enricher - переданные id.
+    """
+
+    def __init__(self):
+        self.tables = {'film_work': [], 'person': []}
+        self.rows = self.tables['film_work']
+        self.links = {}
+        self.now = T0
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+
+    def __init__(self, db: FakePostgres):
+        self.db = db
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query: str, params=None):
+        if 'now()' in query:
+            self.result = [{'now': self.db.now}]
+        elif 'ORDER BY modified, id' in query:
+            table = query.split('FROM content.')[1].split()[0]
+            last = (parse_time(params[0]), params[1])
+            self.result = sorted(
+                (row for row in self.db.tables[table]
+                 if (row['modified'], row['id']) > last),
+                key=lambda row: (row['modified'], row['id'])
+            )
+        elif query == PERSON_FAN_OUT_QUERY:
+            self.result = [
+                {'id': film_id}
+                for person_id in params[0]
+                for film_id in self.db.links[person_id]
+            ]
+        elif query in (FAN_OUT_QUERY, ENRICH_QUERY):
+            self.result = [{'id': row_id} for row_id in params[0]]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        result, self.result = self.result, []
+        return result
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+@pytest.fixture
+def loaded(monkeypatch) -> list:
+    documents = []
+
+    def download_to_elk(rows, index_name):
+        rows = list(rows)
+        documents.extend(document_id for document_id, _ in rows)
+        return len(rows)
+
+    monkeypatch.setattr(pipeline, 'download_to_elk', download_to_elk)
+    return documents
+
+
+class MemoryState:
+
+    def __init__(self):
+        self.state = {}
+
+    def get_state(self, key):
+        return self.state.get(key)
+
+    def set_state(self, key, value):
+        self.state[key] = value
+
+
+ENTITY = Entity(
+    'movies',
+    'modified:{source}',
+    {'film_work': ('film_work', 'modified', FAN_OUT_QUERY)},
+    ENRICH_QUERY,
+    lambda rows: [(row['id'], b'{}') for row in rows],
+)
+
+
+def test_late_commit_with_earlier_modified_is_loaded(loaded):
+    db, state = FakePostgres(), MemoryState()
+    db.rows.append({'id': 'b', 'modified': T0 + timedelta(seconds=5)})
+    db.now = T0 + timedelta(seconds=10)
+    load(db, state, Partition(), ENTITY)
+    assert loaded == ['b']
+
+    # Транзакция начата раньше выгруженной записи b, а зафиксирована
+    # после прохода
+    db.rows.append({'id': 'a', 'modified': T0 + timedelta(seconds=1)})
+    db.now = T0 + timedelta(seconds=12)
+    load(db, state, Partition(), ENTITY)
+    assert 'a' in loaded
+
+
+def test_position_advances_past_changes_older_than_commit_lag(loaded):
+    db, state = FakePostgres(), MemoryState()
+    db.rows.append({'id': 'a', 'modified': T0})
+    db.now = T0 + timedelta(seconds=app_settings.etl_commit_lag + 1)
+    load(db, state, Partition(), ENTITY)
+    load(db, state, Partition(), ENTITY)
+    assert loaded == ['a']
+    assert state.get_state('modified:film_work') == {
+        'modified': str(T0), 'id': 'a'
+    }
+
+
+def test_full_load_exports_each_document_once(loaded):
+    db, state = FakePostgres(), MemoryState()
+    db.rows.append({'id': 'f1', 'modified': T0})
+    for person_id in ('p1', 'p2'):
+        db.tables['person'].append({'id': person_id, 'modified': T0})
+        db.links[person_id] = ['f1']
+    db.now = T0 + timedelta(seconds=app_settings.etl_commit_lag + 1)
+    entity = ENTITY._replace(producers=ENTITY.producers | {
+        'person': ('person', 'modified', PERSON_FAN_OUT_QUERY)
+    })
+    load(db, state, Partition(), entity)
+    assert loaded == ['f1']
+
+    # Изменение персоны после полной выгрузки выгружает ее фильмы
+    db.tables['person'][0]['modified'] = db.now + timedelta(seconds=1)
+    load(db, state, Partition(), entity)
+    assert loaded == ['f1', 'f1']
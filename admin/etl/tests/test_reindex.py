@@ -0,0 +1,56 @@
+import pytest
+
+from reindex import prune_versions
+
+
+class FakeIndices:
+    """Индексы ELK: имя -> алиасы."""
+
+    def __init__(self, indexes: dict):
+        self.indexes = indexes
+
+    def get_alias(self, index: str) -> dict:
+        prefix = index.rstrip('*')
+        return {
+            name: {'aliases': {alias: {} for alias in aliases}}
+            for name, aliases in self.indexes.items()
+            if name.startswith(prefix)
+        }
+
+    def delete(self, index: list) -> None:
+        for name in index:
+            del self.indexes[name]
+
+
+class FakeElasticsearch:
+
+    def __init__(self, indexes: dict):
+        self.indices = FakeIndices(indexes)
+
+
+@pytest.fixture
+def client() -> FakeElasticsearch:
+    return FakeElasticsearch({
+        'movies_20260101000000': [],
+        'movies_20260201000000': [],
+        'movies_20260301000000': [],
+        'movies_20260401000000': ['movies'],
+        'movies_backup': [],
+        'persons_20260101000000': [],
+    })
+
+
+def test_prune_keeps_newest_previous_versions(client):
+    prune_versions(client, 'movies', keep=1)
+    assert sorted(client.indices.indexes) == [
+        'movies_20260301000000',
+        'movies_20260401000000',
+        'movies_backup',
+        'persons_20260101000000',
+    ]
+
+
+def test_prune_never_deletes_alias_target(client):
+    prune_versions(client, 'movies', keep=0)
+    assert 'movies_20260401000000' in client.indices.indexes
+    assert 'movies_20260301000000' not in client.indices.indexes
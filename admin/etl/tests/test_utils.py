@@ -0,0 +1,41 @@
+import pytest
+
+import utils
+from config import app_settings
+from utils import BulkLoadError, download_to_elk
+
+
+@pytest.fixture
+def bulk_statuses(monkeypatch) -> dict:
+    """Статус ответа ELK по id документа, по умолчанию - 201."""
+    statuses = {}
+
+    def streaming_bulk(client, actions, **options):
+        for action in actions:
+            status = statuses.get(action['_id'], 201)
+            yield status < 300, {'index': {
+                '_id': action['_id'],
+                'status': status,
+                'error': None if status < 300 else {'type': 'error'},
+            }}
+
+    monkeypatch.setattr(utils.helpers, 'streaming_bulk', streaming_bulk)
+    monkeypatch.setattr(utils, 'get_elk_client', lambda: None)
+    monkeypatch.setattr(app_settings, 'elk_bulk_threads', 1)
+    return statuses
+
+
+def documents(*ids):
+    return [(document_id, b'{}') for document_id in ids]
+
+
+def test_rejected_document_is_skipped(bulk_statuses):
+    bulk_statuses['bad'] = 400
+    assert download_to_elk(documents('a', 'bad', 'b'), 'movies') == 2
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transient_error_keeps_position(bulk_statuses, status):
+    bulk_statuses['busy'] = status
+    with pytest.raises(BulkLoadError):
+        download_to_elk(documents('a', 'busy'), 'movies')
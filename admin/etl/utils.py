@@ -1,14 +1,28 @@
 import abc
+import contextlib
+import hashlib
 import json
 import logging
-from functools import wraps
+import os
+import select
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache, wraps
+from itertools import islice
 from time import sleep
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
+import psycopg2
 from config import app_settings
 from constants import Messages
+import orjson
 from elasticsearch import Elasticsearch, helpers
-from schema import ElasticsearchData
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from redis import Redis, RedisError
+from schema import (ElasticsearchData, ElasticsearchGenreData,
+                    ElasticsearchPersonData)
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +46,17 @@ class JsonFileStorage(BaseStorage):
         self.encoding = 'utf8'
 
     def save_state(self, state: Dict[str, Any]) -> None:
-        with open(self.file_path, self.mode, encoding=self.encoding) as file:
+        """
+        Состояние пишется во временный файл рядом с основным и заменяет
+        его переименованием: при сбое остается прежнее или новое
+        состояние целиком, но не обрезанный файл.
+        """
+        tmp_path = f'{self.file_path}.tmp'
+        with open(tmp_path, self.mode, encoding=self.encoding) as file:
             json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.file_path)
 
     def retrieve_state(self) -> Dict[str, Any]:
         try:
@@ -88,80 +111,354 @@ def backoff(start_sleep_time=0.1, factor=2, border_sleep_time=10):
     return func_wrapper
 
 
+def postgres_connection() -> contextlib.closing:
+    """Соединение с Postgres, закрываемое по выходу из with."""
+    return contextlib.closing(
+        psycopg2.connect(
+            **app_settings.postgres_dsn, cursor_factory=RealDictCursor
+        )
+    )
+
+
 @backoff()
-def create_elk_index() -> None:
-    with Elasticsearch(app_settings.elk_dsn) as elk_connect:
-        if not elk_connect.ping():
-            logger.info(Messages.ELK_SLEEP_OFFLINE.value)
-            sleep(app_settings.sleep_time)
-        if not elk_connect.indices.exists(
-            index=app_settings.elk_index_name
+def listen(channel: str):
+    """Соединение с Postgres, подписанное на уведомления канала."""
+    connection = psycopg2.connect(**app_settings.postgres_dsn)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(channel)))
+    return connection
+
+
+class ChangeListener:
+    """
+    Ожидание уведомлений Postgres (LISTEN/NOTIFY) об изменениях контента.
+
+    Уведомления шлют триггеры на таблицах content, сами изменения ETL
+    находит по (modified, id). При потере соединения ожидание
+    прерывается, и следующий вызов подключается заново.
+    """
+
+    def __init__(self, channel: str) -> None:
+        self.channel = channel
+        self.connection = None
+
+    def connect(self) -> None:
+        self.connection = listen(channel=self.channel)
+
+    def wait(self, timeout: float) -> None:
+        """Ожидание уведомления, но не дольше timeout секунд."""
+        if self.connection is None or self.connection.closed:
+            self.connect()
+            return
+        try:
+            if select.select([self.connection], [], [], timeout)[0]:
+                self.connection.poll()
+        except psycopg2.Error as error:
+            logger.info(Messages.LISTEN_ERROR.value, error)
+            self.connection.close()
+            return
+        if self.connection.notifies:
+            tables = {notify.payload for notify in self.connection.notifies}
+            self.connection.notifies.clear()
+            logger.info(Messages.CONTENT_CHANGED.value, sorted(tables))
+
+
+@lru_cache()
+def get_elk_client() -> Elasticsearch:
+    """Клиент ELK на все время работы ETL с общим пулом соединений."""
+    return Elasticsearch(
+        app_settings.elk_dsn,
+        request_timeout=app_settings.elk_request_timeout,
+        retry_on_timeout=True,
+        max_retries=app_settings.elk_max_retries,
+    )
+
+
+def setup_logging() -> None:
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+
+def index_version(mapping: dict) -> str:
+    """Отпечаток настроек и маппинга, с которыми создается индекс."""
+    return hashlib.sha1(
+        orjson.dumps(
+            {'settings': app_settings.elk_index_settings, 'mapping': mapping},
+            option=orjson.OPT_SORT_KEYS
+        )
+    ).hexdigest()
+
+
+def get_elk_indexes() -> Dict[str, dict]:
+    """
+    Алиасы индексов ELK, которые читает api, и их маппинги. В _meta
+    маппинга сохраняется отпечаток index_version.
+    """
+    indexes = {
+        app_settings.elk_index_name: app_settings.elk_index_mapping,
+        app_settings.elk_persons_index_name: (
+            app_settings.elk_persons_index_mapping
+        ),
+        app_settings.elk_genres_index_name: (
+            app_settings.elk_genres_index_mapping
+        ),
+    }
+    return {
+        alias: mapping | {'_meta': {'version': index_version(mapping)}}
+        for alias, mapping in indexes.items()
+    }
+
+
+def outdated_elk_indexes() -> list[str]:
+    """
+    Алиасы, индексы которых созданы с другими настройками или маппингом
+    (или до появления отпечатка в _meta). Новые поля и анализаторы
+    появляются в документах только при переиндексации.
+    """
+    client = get_elk_client()
+    outdated = []
+    for alias, mapping in get_elk_indexes().items():
+        version = mapping['_meta']['version']
+        current = client.indices.get_mapping(index=alias)
+        if any(
+            index['mappings'].get('_meta', {}).get('version') != version
+            for index in current.values()
         ):
-            elk_connect.indices.create(
-                index=app_settings.elk_index_name,
-                settings=app_settings.elk_index_settings,
-                mappings=app_settings.elk_index_mapping
-            )
-            logger.info(
-                Messages.ELK_INDEX_CREATE.value,
-                app_settings.elk_index_name
-            )
+            outdated.append(alias)
+    return outdated
+
+
+def versioned_index_name(alias: str) -> str:
+    """Имя новой версии индекса за алиасом."""
+    return f'{alias}_{datetime.now():%Y%m%d%H%M%S}'
+
+
+@backoff()
+def create_elk_index() -> None:
+    """
+    Создание недостающих индексов. Индекс создается с версией в имени и
+    алиасом, по которому его читают api и ETL, чтобы переиндексация
+    (reindex.py) могла подменить его без простоя.
+    """
+    elk_connect = get_elk_client()
+    if not elk_connect.ping():
+        logger.info(Messages.ELK_SLEEP_OFFLINE.value)
+        sleep(app_settings.sleep_time)
+    for alias, mapping in get_elk_indexes().items():
+        if elk_connect.indices.exists(index=alias):
+            continue
+        index_name = versioned_index_name(alias)
+        elk_connect.indices.create(
+            index=index_name,
+            settings=app_settings.elk_index_settings,
+            mappings=mapping,
+            aliases={alias: {}}
+        )
+        logger.info(Messages.ELK_INDEX_CREATE.value, index_name)
 
 
-def transform_data_for_elk(rows: list) -> list:
-    transformed_part = []
+ROLES = {'actor': 'actors', 'director': 'directors', 'writer': 'writers'}
+
+
+def transform_data_for_elk(rows: list) -> list[tuple[str, bytes]]:
+    """
+    Документы фильмов для ELK: пары (id, JSON документа).
+
+    Персоны раскладываются по ролям за один проход, документ сразу
+    сериализуется orjson без промежуточной модели. В режиме
+    etl_strict_validation документ дополнительно проверяется схемой
+    ElasticsearchData.
+    """
+    documents = []
     for row in rows:
-        transformed_row = ElasticsearchData(
-            id=row.get('id'),
-            imdb_rating=row.get('rating'),
-            genre=[
-                genre.get('genre_name') for genre in row.get('genres')
+        persons = {'actors': [], 'directors': [], 'writers': []}
+        for person in row['persons']:
+            role = ROLES.get(person['person_role'])
+            if role is not None:
+                persons[role].append(
+                    {'id': person['person_id'],
+                     'full_name': person['person_name']}
+                )
+        genres = [
+            {'id': genre['genre_id'], 'name': genre['genre_name']}
+            for genre in row['genres']
+        ]
+        source = {
+            'id': row['id'],
+            'imdb_rating': row['rating'],
+            'type': row['type'],
+            'genre': [genre['name'] for genre in genres],
+            'genres': genres,
+            'title': row['title'],
+            'description': row['description'],
+            'director': [
+                person['full_name'] for person in persons['directors']
             ],
-            genres=[genre for genre in row.get('genres')],
-            title=row.get('title'),
-            description=row.get('description'),
-            director=[
-                person.get('person_name') for person in row.get('persons')
-                if person.get('person_role') == 'director'
+            'directors': persons['directors'],
+            'actors_names': [
+                person['full_name'] for person in persons['actors']
             ],
-            directors=[
-                person for person in row.get('persons')
-                if person.get('person_role') == 'director'
+            'writers_names': [
+                person['full_name'] for person in persons['writers']
             ],
-            actors_names=[
-                person.get('person_name') for person in row.get('persons')
-                if person.get('person_role') == 'actor'
-            ],
-            writers_names=[
-                person.get('person_name') for person in row.get('persons')
-                if person.get('person_role') == 'writer'
-            ],
-            actors=[
-                person for person in row.get('persons')
-                if person.get('person_role') == 'actor'
-            ],
-            writers=[
-                person for person in row.get('persons')
-                if person.get('person_role') == 'writer'
-            ],
-        )
-        transformed_part.append(transformed_row)
-    return transformed_part
+            'actors': persons['actors'],
+            'writers': persons['writers'],
+        }
+        if app_settings.etl_strict_validation:
+            ElasticsearchData.model_validate(source)
+        documents.append((source['id'], orjson.dumps(source)))
+    return documents
 
 
-@backoff()
-def download_to_elk(rows: list) -> None:
-    with Elasticsearch(app_settings.elk_dsn) as elk_connect:
-        helpers.bulk(
-            client=elk_connect,
-            actions=[
-                {
-                    '_index': app_settings.elk_index_name,
-                    '_id': row.id,
-                    '_source': row.model_dump_json()
-                }
-                for row in rows
+def transform_persons_for_elk(rows: list) -> list[tuple[str, bytes]]:
+    """Документы персон для ELK: пары (id, JSON документа)."""
+    documents = []
+    for row in rows:
+        films = {}
+        for film in row['films']:
+            films.setdefault(film['film_id'], []).append(film['role'])
+        source = {
+            'id': row['id'],
+            'full_name': row['full_name'],
+            'films': [
+                {'id': film_id, 'roles': roles}
+                for film_id, roles in films.items()
             ],
-            stats_only=True
+        }
+        if app_settings.etl_strict_validation:
+            ElasticsearchPersonData.model_validate(source)
+        documents.append((source['id'], orjson.dumps(source)))
+    return documents
+
+
+def transform_genres_for_elk(rows: list) -> list[tuple[str, bytes]]:
+    """Документы жанров для ELK: пары (id, JSON документа)."""
+    documents = []
+    for row in rows:
+        source = {'id': row['id'], 'name': row['name']}
+        if app_settings.etl_strict_validation:
+            ElasticsearchGenreData.model_validate(source)
+        documents.append((source['id'], orjson.dumps(source)))
+    return documents
+
+
+class BulkLoadError(Exception):
+    """Часть документов не загружена в ELK из-за временных ошибок."""
+
+
+def is_transient(status: Optional[int]) -> bool:
+    """Ошибка ELK, после которой документ стоит загрузить повторно."""
+    return status is None or status == 429 or status >= 500
+
+
+def bulk_chunks(actions: Iterable, **options) -> Iterator[tuple]:
+    """
+    Результаты streaming_bulk по пачкам из elk_bulk_chunk_size
+    документов, которые отправляются в elk_bulk_threads потоков.
+
+    В отличие от parallel_bulk, каждая пачка повторяет отклоненные
+    с 429 документы (max_retries). Одновременно в памяти не больше
+    elk_bulk_threads пачек, результаты идут в порядке документов.
+    """
+    chunk_size = app_settings.elk_bulk_chunk_size
+    actions = iter(actions)
+    chunks = iter(lambda: list(islice(actions, chunk_size)), [])
+
+    def load_chunk(chunk: list) -> list:
+        return list(helpers.streaming_bulk(get_elk_client(), chunk, **options))
+
+    with ThreadPoolExecutor(app_settings.elk_bulk_threads) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(load_chunk, chunk))
+            if len(pending) >= app_settings.elk_bulk_threads:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def download_to_elk(
+    rows: Iterable, index_name: str = app_settings.elk_index_name
+) -> int:
+    """
+    Потоковая загрузка документов в ELK.
+
+    rows - пары (id, JSON документа). Документы отправляются пачками
+    не больше elk_bulk_chunk_size документов и elk_bulk_chunk_bytes
+    байт, при elk_bulk_threads > 1 - параллельно; отклоненные с 429
+    пачки повторяются до elk_max_retries раз. Ошибки отдельных
+    документов логируются, загрузка остальных продолжается.
+
+    Документ, отклоненный ELK (4xx: ошибка маппинга или разбора), не
+    загрузится и при повторе, поэтому пропускается. Если остались
+    временные ошибки (429, 5xx), в конце поднимается BulkLoadError,
+    чтобы позиция выгрузки не сдвинулась за незагруженные документы.
+    Возвращает число загруженных документов.
+    """
+    actions = (
+        {'_index': index_name, '_id': document_id, '_source': source}
+        for document_id, source in rows
+    )
+    options = dict(
+        chunk_size=app_settings.elk_bulk_chunk_size,
+        max_chunk_bytes=app_settings.elk_bulk_chunk_bytes,
+        max_retries=app_settings.elk_max_retries,
+        raise_on_error=False,
+    )
+    if app_settings.elk_bulk_threads > 1:
+        results = bulk_chunks(actions, **options)
+    else:
+        results = helpers.streaming_bulk(get_elk_client(), actions, **options)
+    loaded = rejected = failed = 0
+    for ok, item in results:
+        if ok:
+            loaded += 1
+            continue
+        error = next(iter(item.values()))
+        if is_transient(error.get('status')):
+            failed += 1
+            message = Messages.ELK_DOCUMENT_ERROR
+        else:
+            rejected += 1
+            message = Messages.ELK_DOCUMENT_REJECTED
+        logger.error(message.value, error.get('_id'), error.get('error'))
+    logger.info(
+        Messages.ELK_DOWNLOAD.value, index_name, loaded, rejected, failed
+    )
+    if failed:
+        raise BulkLoadError(
+            Messages.ELK_DOWNLOAD.value
+            % (index_name, loaded, rejected, failed)
         )
-        logger.info(Messages.ELK_DOWNLOAD.value, len(rows))
+    return loaded
+
+
+def bump_index_generation(index_name: str) -> None:
+    """
+    Увеличивает поколение индекса, по которому api сбрасывает
+    кэш результатов поиска, и оповещает воркеры api об изменении.
+
+    Недоступность Redis не останавливает синхронизацию: данные в ELK уже
+    загружены, кэш api устареет не дольше времени жизни записей.
+    """
+    generation_key = app_settings.redis_generation_key.format(
+        index=index_name
+    )
+    try:
+        with Redis.from_url(
+            app_settings.redis_dsn,
+            socket_connect_timeout=app_settings.redis_timeout,
+            socket_timeout=app_settings.redis_timeout
+        ) as redis_connect:
+            generation = redis_connect.incr(generation_key)
+            redis_connect.publish(
+                app_settings.redis_invalidation_channel,
+                f'etl {generation_key}'
+            )
+    except RedisError as error:
+        logger.error(Messages.INDEX_GENERATION_ERROR.value, index_name, error)
+        return
+    logger.info(Messages.INDEX_GENERATION.value, index_name, generation)
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# Уведомления ETL об изменениях контента (LISTEN content_changes).
+# Изменение связей фильма с персонами и жанрами обновляет modified фильма,
+# чтобы ETL выгрузил его по индексу на (modified, id).
+CREATE_TRIGGERS = '''
+CREATE FUNCTION content.notify_content_changes() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('content_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION content.touch_film_work() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE content.film_work SET modified = now()
+        WHERE id = OLD.film_work_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE content.film_work SET modified = now()
+        WHERE id = NEW.film_work_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER film_work_notify
+AFTER INSERT OR UPDATE OR DELETE ON content.film_work
+FOR EACH STATEMENT EXECUTE FUNCTION content.notify_content_changes();
+
+CREATE TRIGGER person_notify
+AFTER INSERT OR UPDATE OR DELETE ON content.person
+FOR EACH STATEMENT EXECUTE FUNCTION content.notify_content_changes();
+
+CREATE TRIGGER genre_notify
+AFTER INSERT OR UPDATE OR DELETE ON content.genre
+FOR EACH STATEMENT EXECUTE FUNCTION content.notify_content_changes();
+
+CREATE TRIGGER person_film_work_touch
+AFTER INSERT OR UPDATE OR DELETE ON content.person_film_work
+FOR EACH ROW EXECUTE FUNCTION content.touch_film_work();
+
+CREATE TRIGGER genre_film_work_touch
+AFTER INSERT OR UPDATE OR DELETE ON content.genre_film_work
+FOR EACH ROW EXECUTE FUNCTION content.touch_film_work();
+'''
+
+DROP_TRIGGERS = '''
+DROP TRIGGER genre_film_work_touch ON content.genre_film_work;
+DROP TRIGGER person_film_work_touch ON content.person_film_work;
+DROP TRIGGER genre_notify ON content.genre;
+DROP TRIGGER person_notify ON content.person;
+DROP TRIGGER film_work_notify ON content.film_work;
+DROP FUNCTION content.touch_film_work();
+DROP FUNCTION content.notify_content_changes();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_modified_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+# Изменение связи персоны с фильмом обновляет films_modified персоны, по
+# которому ETL выгружает индекс persons: при удалении связи fan-out по
+# фильму уже не найдет эту персону. Отдельное поле, а не modified, чтобы
+# новая роль не выгружала заново все фильмы персоны в индекс movies.
+CREATE_TRIGGER = '''
+CREATE FUNCTION content.touch_person_films() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE content.person SET films_modified = now()
+        WHERE id = OLD.person_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE content.person SET films_modified = now()
+        WHERE id = NEW.person_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER person_film_work_touch_person_films
+AFTER INSERT OR UPDATE OR DELETE ON content.person_film_work
+FOR EACH ROW EXECUTE FUNCTION content.touch_person_films();
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER person_film_work_touch_person_films ON content.person_film_work;
+DROP FUNCTION content.touch_person_films();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_content_change_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='films_modified',
+            field=models.DateTimeField(
+                editable=False, null=True, verbose_name='films modified'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(
+                fields=['films_modified', 'id'],
+                name='person_films_modified_id_idx'
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
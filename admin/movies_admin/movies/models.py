@@ -45,6 +45,11 @@ class Genre(UUIDMixin, TimeStampedMixin):
         db_table = "content\".\"genre"
         verbose_name = _('genre')
         verbose_name_plural = _('genries')
+        indexes = [
+            models.Index(
+                fields=['modified', 'id'], name='genre_modified_id_idx'
+            ),
+        ]
 
 
 class Person(UUIDMixin, TimeStampedMixin):
@@ -52,6 +57,11 @@ class Person(UUIDMixin, TimeStampedMixin):
         _('name'), max_length=CHAR_FIELD_MAX_LENGTH, null=True
     )
     gender = models.TextField(_('gender'), choices=Gender.choices, null=True)
+    # Время изменения связей с фильмами, обновляется триггером
+    # на person_film_work (миграция 0004)
+    films_modified = models.DateTimeField(
+        _('films modified'), null=True, editable=False
+    )
 
     def __str__(self):
         return str(self.full_name)
@@ -60,6 +70,15 @@ class Person(UUIDMixin, TimeStampedMixin):
         db_table = "content\".\"person"
         verbose_name = _('actor')
         verbose_name_plural = _('actors')
+        indexes = [
+            models.Index(
+                fields=['modified', 'id'], name='person_modified_id_idx'
+            ),
+            models.Index(
+                fields=['films_modified', 'id'],
+                name='person_films_modified_id_idx'
+            ),
+        ]
 
 
 class PersonFilmwork(UUIDMixin):
@@ -105,6 +124,11 @@ class Filmwork(UUIDMixin, TimeStampedMixin):
         db_table = "content\".\"film_work"
         verbose_name = _('film')
         verbose_name_plural = _('films')
+        indexes = [
+            models.Index(
+                fields=['modified', 'id'], name='film_work_modified_id_idx'
+            ),
+        ]
 
 
 class GenreFilmwork(UUIDMixin):
@@ -0,0 +1,222 @@
+"""Нагрузочный тест api с распределением обращений по Ципфу.
+
+Смесь запросов повторяет поведение клиентов: карточки фильмов и персон,
+список жанров, листание каталога (в том числе глубокие страницы) и поиск.
+Фильмы, персоны, номера страниц и поисковые запросы выбираются по закону
+Ципфа: небольшая доля популярных объектов получает большую часть
+обращений, как в реальном каталоге.
+
+Токены подписываются закрытым ключом из `--private-key` (по умолчанию
+ключ сервиса auth), парным к `api/src/creds/public_key.pem`. В конце
+прогона выводятся p50/p95/p99 по каждому типу запроса и доля попаданий
+в кэш по уровням (по разнице счетчиков `/metrics` api до и после
+прогона), отчет сохраняется в JSON для сравнения прогонов.
+
+Запуск из каталога `api/docs/research/loadtest` после `seed.py`:
+
+    locust -f locustfile.py --headless -u 200 -r 20 -t 5m \\
+        --host http://localhost:5000 --report-file reports/baseline.json
+"""
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+import json
+from pathlib import Path
+import random
+import uuid
+
+from jose import jwt
+from locust import FastHttpUser, between, events, task
+from prometheus_client.parser import text_string_to_metric_families
+import requests
+
+BASE_DIR = Path(__file__).parent
+PRIVATE_KEY_PATH = BASE_DIR.parents[3].joinpath(
+    "auth", "src", "creds", "private_key.pem"
+)
+PERCENTILES = (0.5, 0.95, 0.99)
+
+cache_counters: dict[str, dict] = {}
+
+
+class Zipf:
+    """Выбор элементов списка с вероятностью, обратной рангу в степени s."""
+
+    def __init__(self, items: list, s: float):
+        self.items = items
+        self.cum_weights = list(
+            accumulate(1 / rank**s for rank in range(1, len(items) + 1))
+        )
+
+    def choice(self):
+        point = random.random() * self.cum_weights[-1]
+        return self.items[bisect(self.cum_weights, point)]
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--max-page", type=int, default=400)
+    parser.add_argument("--app-name", default="PRACTIX")
+    parser.add_argument("--private-key", default=str(PRIVATE_KEY_PATH))
+    parser.add_argument("--report-file", default="")
+
+
+def read_cache_counters(host: str) -> dict:
+    counters = {}
+    try:
+        response = requests.get(f"{host}/metrics/", timeout=10)
+    except requests.RequestException:
+        return counters
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "api_cache_requests":
+            continue
+        for sample in family.samples:
+            if sample.name == "api_cache_requests_total":
+                key = (sample.labels["tier"], sample.labels["result"])
+                counters[key] = sample.value
+    return counters
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    cache_counters["start"] = read_cache_counters(environment.host)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    cache_counters["stop"] = read_cache_counters(environment.host)
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    report = {"requests": {}, "cache_hit_ratio": {}}
+    for (name, method), entry in sorted(environment.stats.entries.items()):
+        report["requests"][name] = {
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": round(entry.total_rps, 1),
+        } | {
+            f"p{int(p * 100)}": entry.get_response_time_percentile(p)
+            for p in PERCENTILES
+        }
+
+    start = cache_counters.get("start", {})
+    stop = cache_counters.get("stop", {})
+    for tier in ("local", "redis"):
+        hits, misses = (
+            stop.get((tier, result), 0) - start.get((tier, result), 0)
+            for result in ("hit", "miss")
+        )
+        if hits + misses > 0:
+            report["cache_hit_ratio"][tier] = round(hits / (hits + misses), 3)
+
+    print(f"\n{'запрос':<28}{'всего':>9}{'ошибок':>8}{'p50':>7}{'p95':>7}"
+          f"{'p99':>7}")
+    for name, row in report["requests"].items():
+        print(
+            f"{name:<28}{row['requests']:>9}{row['failures']:>8}"
+            f"{row['p50']:>7}{row['p95']:>7}{row['p99']:>7}"
+        )
+    for tier, ratio in report["cache_hit_ratio"].items():
+        print(f"попадания в кэш ({tier}): {ratio:.1%}")
+
+    if report_file := environment.parsed_options.report_file:
+        Path(report_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(report_file, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+class ApiUser(FastHttpUser):
+    wait_time = between(0.05, 0.2)
+
+    def on_start(self):
+        options = self.environment.parsed_options
+        with open(BASE_DIR.joinpath("data", "ids.json")) as f:
+            ids = json.load(f)
+        self.films = Zipf(ids["films"], options.zipf_s)
+        self.persons = Zipf(ids["persons"], options.zipf_s)
+        self.genres = Zipf(ids["genres"], options.zipf_s)
+        self.queries = Zipf(ids["queries"], options.zipf_s)
+        self.pages = Zipf(list(range(1, options.max_page + 1)), options.zipf_s)
+        self.page_size = options.page_size
+        self.max_page = options.max_page
+        with open(options.private_key) as f:
+            self.token = self.get_bearer_token(options.app_name, f.read())
+
+    def get(self, url: str, name: str, **params):
+        self.client.get(
+            url,
+            params=params,
+            name=name,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "X-Request-Id": str(uuid.uuid4()),
+            },
+        )
+
+    @task(40)
+    def film_details(self):
+        self.get(f"/api/v1/films/{self.films.choice()}", "film details")
+
+    @task(10)
+    def person_details(self):
+        self.get(f"/api/v1/persons/{self.persons.choice()}", "person details")
+
+    @task(10)
+    def genres_list(self):
+        self.get("/api/v1/genres/", "genres list")
+
+    @task(15)
+    def films_by_genre(self):
+        self.get(
+            "/api/v1/films/",
+            "films by genre",
+            genre=self.genres.choice(),
+            page_number=self.pages.choice(),
+            page_size=self.page_size,
+        )
+
+    @task(5)
+    def deep_page(self):
+        # При page_size=50 это страницы за пределами max_result_window
+        self.get(
+            "/api/v1/films/",
+            "films deep page",
+            page_number=random.randint(200, self.max_page),
+            page_size=self.page_size,
+        )
+
+    @task(15)
+    def search(self):
+        self.get(
+            "/api/v1/films/search",
+            "films search",
+            query=self.queries.choice(),
+            page_number=self.pages.choice() % 5 + 1,
+            page_size=self.page_size,
+        )
+
+    @task(5)
+    def suggest(self):
+        self.get(
+            "/api/v1/films/suggest",
+            "films suggest",
+            query=self.queries.choice()[: random.randint(1, 4)],
+        )
+
+    @staticmethod
+    def get_bearer_token(app_name: str, private_key: str) -> str:
+        iat = datetime.now(tz=timezone.utc)
+        payload = {
+            "jti": str(uuid.uuid4()),
+            "iss": "AUTH",
+            "sub": str(uuid.uuid4()),
+            "aud": [app_name],
+            "iat": iat,
+            "exp": iat + timedelta(days=1),
+            "token_type": "access",
+            "roles": ["USER"],
+        }
+        return jwt.encode(payload, private_key, algorithm="RS256")
@@ -0,0 +1,221 @@
+"""Наполнение локальных ES и Redis данными для нагрузочного теста api.
+
+Индексы создаются с маппингами ETL (`admin/etl/config.py`), документы
+генерируются детерминированно по `--seed`. Идентификаторы фильмов,
+персон и жанров, а также слова для поиска сохраняются в `data/ids.json`,
+откуда их берет `locustfile.py`. Redis очищается, чтобы каждый прогон
+начинался с холодного кэша.
+
+Запуск из каталога `api/docs/research/loadtest`:
+
+    python seed.py --films 50000 --persons 20000
+"""
+import argparse
+from datetime import datetime
+import json
+from pathlib import Path
+import random
+import sys
+import uuid
+
+from elasticsearch import Elasticsearch, helpers
+from redis import Redis
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR.parents[3].joinpath("admin", "etl")))
+
+from config import app_settings  # noqa: E402
+
+GENRES = (
+    "Action",
+    "Adventure",
+    "Animation",
+    "Comedy",
+    "Crime",
+    "Documentary",
+    "Drama",
+    "Family",
+    "Fantasy",
+    "History",
+    "Horror",
+    "Music",
+    "Mystery",
+    "Romance",
+    "Sci-Fi",
+    "Thriller",
+    "War",
+    "Western",
+)
+WORDS = (
+    "star war trek galaxy empire space wars rebel return hope force "
+    "night dark knight city lost world river king queen ring shadow "
+    "ghost dream love secret last first storm fire ice iron blood"
+).split()
+FIRST_NAMES = (
+    "John Mary James Anna George Helen Mark Olga Peter Kate "
+    "Harrison Carrie Mark Ewan Natalie Liam Ian Orlando Viggo Cate"
+).split()
+LAST_NAMES = (
+    "Smith Ford Fisher Hamill McGregor Portman Neeson McKellen Bloom "
+    "Mortensen Blanchett Ivanov Petrova Lucas Abrams Johnson Kasdan"
+).split()
+ROLES = ("actor", "director", "writer")
+
+
+def make_persons(count: int) -> list[dict]:
+    return [
+        {
+            "id": str(uuid.UUID(int=random.getrandbits(128))),
+            "full_name": f"{random.choice(FIRST_NAMES)} "
+            f"{random.choice(LAST_NAMES)}",
+            "films": {},
+        }
+        for _ in range(count)
+    ]
+
+
+def make_films(count: int, genres: list[dict], persons: list[dict]):
+    types = ("movie",) * 4 + ("tv_show",)
+    for _ in range(count):
+        film_id = str(uuid.UUID(int=random.getrandbits(128)))
+        cast = {
+            role: random.sample(persons, k=random.randint(*bounds))
+            for role, bounds in zip(ROLES, ((3, 12), (1, 2), (1, 4)))
+        }
+        for role, role_persons in cast.items():
+            for person in role_persons:
+                person["films"].setdefault(film_id, []).append(role)
+
+        film_genres = random.sample(genres, k=random.randint(1, 3))
+        title = " ".join(random.choices(WORDS, k=random.randint(1, 4)))
+        persons_by_role = {
+            role: [
+                {"id": person["id"], "full_name": person["full_name"]}
+                for person in role_persons
+            ]
+            for role, role_persons in cast.items()
+        }
+        yield {
+            "id": film_id,
+            "imdb_rating": round(random.uniform(1, 10), 1),
+            "type": random.choice(types),
+            "genre": [genre["name"] for genre in film_genres],
+            "genres": film_genres,
+            "title": title.title(),
+            "description": " ".join(random.choices(WORDS, k=40)),
+            "director": [p["full_name"] for p in persons_by_role["director"]],
+            "directors": persons_by_role["director"],
+            "actors_names": [p["full_name"] for p in persons_by_role["actor"]],
+            "writers_names": [
+                p["full_name"] for p in persons_by_role["writer"]
+            ],
+            "actors": persons_by_role["actor"],
+            "writers": persons_by_role["writer"],
+        }
+
+
+def recreate_index(elk: Elasticsearch, name: str, mappings: dict) -> None:
+    # Как в ETL: name - алиас на версию индекса, прежние версии удаляются
+    if elk.indices.exists_alias(name=name):
+        elk.indices.delete(index=list(elk.indices.get_alias(name=name)))
+    else:
+        elk.indices.delete(index=name, ignore_unavailable=True)
+    elk.indices.create(
+        index=f"{name}_{datetime.now():%Y%m%d%H%M%S}",
+        settings=app_settings.elk_index_settings,
+        mappings=mappings,
+        aliases={name: {}},
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    genres = [
+        {"id": str(uuid.UUID(int=random.getrandbits(128))), "name": name}
+        for name in GENRES
+    ]
+    persons = make_persons(args.persons)
+
+    with Elasticsearch(args.es) as elk:
+        recreate_index(elk, args.movies_index, app_settings.elk_index_mapping)
+        recreate_index(
+            elk, args.persons_index, app_settings.elk_persons_index_mapping
+        )
+        recreate_index(
+            elk, args.genres_index, app_settings.elk_genres_index_mapping
+        )
+
+        film_ids = []
+
+        def film_actions():
+            for film in make_films(args.films, genres, persons):
+                film_ids.append(film["id"])
+                yield {
+                    "_index": args.movies_index,
+                    "_id": film["id"],
+                    "_source": film,
+                }
+
+        helpers.bulk(elk, film_actions(), chunk_size=1000)
+        helpers.bulk(
+            elk,
+            (
+                {
+                    "_index": args.persons_index,
+                    "_id": person["id"],
+                    "_source": {
+                        "id": person["id"],
+                        "full_name": person["full_name"],
+                        "films": [
+                            {"id": film_id, "roles": roles}
+                            for film_id, roles in person["films"].items()
+                        ],
+                    },
+                }
+                for person in persons
+            ),
+            chunk_size=1000,
+        )
+        helpers.bulk(
+            elk,
+            (
+                {"_index": args.genres_index, "_id": g["id"], "_source": g}
+                for g in genres
+            ),
+        )
+        elk.indices.refresh(index="_all")
+
+    with Redis.from_url(args.redis) as redis:
+        redis.flushdb()
+
+    # Порядок задает популярность: первые элементы чаще выбираются по Ципфу
+    random.shuffle(film_ids)
+    random.shuffle(persons)
+    BASE_DIR.joinpath("data").mkdir(exist_ok=True)
+    with open(BASE_DIR.joinpath("data", "ids.json"), "w") as f:
+        json.dump(
+            {
+                "films": film_ids,
+                "persons": [person["id"] for person in persons],
+                "genres": [genre["id"] for genre in genres],
+                "queries": WORDS,
+            },
+            f,
+        )
+    print(
+        f"Загружено фильмов: {len(film_ids)}, персон: {len(persons)}, "
+        f"жанров: {len(genres)}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--es", default=app_settings.elk_dsn)
+    parser.add_argument("--redis", default=app_settings.redis_dsn)
+    parser.add_argument("--films", type=int, default=50000)
+    parser.add_argument("--persons", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--movies-index", default="movies")
+    parser.add_argument("--persons-index", default="persons")
+    parser.add_argument("--genres-index", default="genres")
+    main(parser.parse_args())
@@ -0,0 +1,189 @@
+"""Стоимость сборки и сериализации страницы фильмов в api.
+
+Страница фильмов собирается из `_source` документов индекса `movies`
+тремя способами:
+
+- было: `Film(**source)`, затем FastAPI повторно валидирует ответ по
+  `response_model`, прогоняет его через `jsonable_encoder` и
+  сериализует `json.dumps` в `JSONResponse`;
+- model_construct: сборка моделей без валидации и `ORJSONModelResponse`;
+- стало: `Film(**source)` (одна валидация в pydantic-core) и
+  `ORJSONModelResponse`, который сериализует готовые модели orjson.
+
+Документы генерируются по схеме индекса `movies` (ETL) с типичным
+для базы числом жанров и персон.
+
+Запуск из каталога `api/src`:
+
+    PYTHONPATH=. python ../docs/research/serialization/benchmark.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.v1.utils import ORJSONModelResponse
+from schemas import schemas
+
+WORDS = (
+    "космос звезда путешествие война мир любовь герой корабль планета "
+    "империя повстанцы пилот робот галактика тайна город"
+).split()
+GENRES = [
+    {"id": str(uuid.uuid4()), "name": name}
+    for name in (
+        "Action",
+        "Adventure",
+        "Fantasy",
+        "Sci-Fi",
+        "Drama",
+        "Comedy",
+        "Thriller",
+    )
+]
+
+
+def make_person() -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "full_name": f"{random.choice(WORDS).title()} "
+        f"{random.choice(WORDS).title()}",
+    }
+
+
+def make_film() -> dict:
+    actors = [make_person() for _ in range(random.randint(4, 12))]
+    directors = [make_person() for _ in range(random.randint(1, 2))]
+    writers = [make_person() for _ in range(random.randint(1, 5))]
+    return {
+        "id": str(uuid.uuid4()),
+        "imdb_rating": round(random.uniform(1, 10), 1),
+        "genre": [genre["name"] for genre in GENRES[:3]],
+        "title": " ".join(random.choices(WORDS, k=3)).title(),
+        "description": " ".join(random.choices(WORDS, k=40)),
+        "director": [person["full_name"] for person in directors],
+        "actors_names": [person["full_name"] for person in actors],
+        "writers_names": [person["full_name"] for person in writers],
+        "genres": random.sample(GENRES, k=random.randint(1, 3)),
+        "actors": actors,
+        "directors": directors,
+        "writers": writers,
+    }
+
+
+RESPONSE_FIELD = create_response_field(
+    name="Response_get_films", type_=schemas.FilmResponse
+)
+
+
+async def render_before(sources: list[dict], page_size: int) -> bytes:
+    films = [schemas.Film(**source) for source in sources]
+    response = schemas.FilmResponse(
+        page_number=1,
+        page_size=page_size,
+        total_pages=100,
+        results=films,
+    )
+    content = await serialize_response(
+        field=RESPONSE_FIELD, response_content=response
+    )
+    return JSONResponse(content).body
+
+
+def construct_film(source: dict) -> schemas.Film:
+    def construct_persons(persons: list[dict]) -> list[schemas.FilmPerson]:
+        return [
+            schemas.FilmPerson.model_construct(
+                id=uuid.UUID(person["id"]), full_name=person["full_name"]
+            )
+            for person in persons
+        ]
+
+    return schemas.Film.model_construct(
+        id=uuid.UUID(source["id"]),
+        title=source["title"],
+        description=source.get("description"),
+        imdb_rating=source.get("imdb_rating"),
+        genres=[
+            schemas.FilmGenre.model_construct(
+                id=uuid.UUID(genre["id"]), name=genre["name"]
+            )
+            for genre in source.get("genres", [])
+        ],
+        actors=construct_persons(source.get("actors", [])),
+        directors=construct_persons(source.get("directors", [])),
+        writers=construct_persons(source.get("writers", [])),
+    )
+
+
+async def render_construct(sources: list[dict], page_size: int) -> bytes:
+    films = [construct_film(source) for source in sources]
+    response = schemas.FilmResponse(
+        page_number=1,
+        page_size=page_size,
+        total_pages=100,
+        results=films,
+    )
+    return ORJSONModelResponse(response).body
+
+
+async def render_after(sources: list[dict], page_size: int) -> bytes:
+    films = [schemas.Film(**source) for source in sources]
+    response = schemas.FilmResponse(
+        page_number=1,
+        page_size=page_size,
+        total_pages=100,
+        results=films,
+    )
+    return ORJSONModelResponse(response).body
+
+
+async def measure(render, pages: list[list[dict]], page_size: int) -> float:
+    started = time.perf_counter()
+    for sources in pages:
+        await render(sources, page_size)
+    return (time.perf_counter() - started) / len(pages) * 1e3
+
+
+async def main(pages: int, page_sizes: list[int]) -> None:
+    print(
+        f"{'размер страницы':>16} {'было, мс':>10} "
+        f"{'model_construct, мс':>20} {'стало, мс':>10}"
+    )
+    for page_size in page_sizes:
+        data = [
+            [make_film() for _ in range(page_size)] for _ in range(10)
+        ]
+        # Все способы должны отдавать один и тот же JSON
+        bodies = [
+            json.loads(await render(data[0], page_size))
+            for render in (render_before, render_construct, render_after)
+        ]
+        assert bodies[0] == bodies[1] == bodies[2]
+
+        rounds = [data[i % len(data)] for i in range(pages)]
+        elapsed = [
+            await measure(render, rounds, page_size)
+            for render in (render_before, render_construct, render_after)
+        ]
+        print(
+            f"{page_size:>16} {elapsed[0]:>10.3f} "
+            f"{elapsed[1]:>20.3f} {elapsed[2]:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument(
+        "--page-sizes", type=int, nargs="+", default=[10, 50, 100]
+    )
+    args = parser.parse_args()
+    random.seed(0)
+    asyncio.run(main(args.pages, args.page_sizes))
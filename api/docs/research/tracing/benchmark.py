@@ -0,0 +1,122 @@
+"""Накладные расходы трассировки на один запрос api.
+
+Запрос моделируется так же, как его видит приложение: серверный спан
+FastAPIInstrumentor и вложенные спаны слоев `service`, `redis`,
+`elasticsearch`, `redis`. Для каждой настройки считается время
+выполнения запроса в основном потоке и процессорное время всего
+процесса, включая поток экспорта `BatchSpanProcessor`.
+
+Запуск из каталога `api/src`:
+
+    python ../docs/research/tracing/benchmark.py --requests 20000
+"""
+import argparse
+import os
+import time
+import warnings
+
+from opentelemetry import trace
+from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+LAYERS = ("service", "redis", "elasticsearch", "redis")
+
+SETTINGS = {
+    "disabled": {"enabled": False},
+    "jaeger+console, 100% (было)": {
+        "ratio": 1.0,
+        "exporters": ("jaeger", "console"),
+        "layer_spans": True,
+    },
+    "jaeger, 100%": {
+        "ratio": 1.0,
+        "exporters": ("jaeger",),
+        "layer_spans": True,
+    },
+    "jaeger, 5%": {
+        "ratio": 0.05,
+        "exporters": ("jaeger",),
+        "layer_spans": True,
+    },
+    "jaeger, 5%, без спанов слоев": {
+        "ratio": 0.05,
+        "exporters": ("jaeger",),
+        "layer_spans": False,
+    },
+}
+
+
+def make_tracers(
+    enabled: bool = True,
+    ratio: float = 1.0,
+    exporters: tuple = (),
+    layer_spans: bool = True,
+) -> tuple[TracerProvider | None, trace.Tracer, trace.Tracer]:
+    if not enabled:
+        return None, trace.NoOpTracer(), trace.NoOpTracer()
+
+    provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(ratio)))
+    for exporter in exporters:
+        if exporter == "console":
+            # Вывод консольного экспортера отбрасывается
+            provider.add_span_processor(
+                BatchSpanProcessor(
+                    ConsoleSpanExporter(out=open(os.devnull, "w"))
+                )
+            )
+        else:
+            provider.add_span_processor(
+                BatchSpanProcessor(
+                    JaegerExporter(
+                        agent_host_name="localhost",
+                        agent_port=6831,
+                        udp_split_oversized_batches=True,
+                    )
+                )
+            )
+    request_tracer = provider.get_tracer("request")
+    layer_tracer = (
+        provider.get_tracer("layer") if layer_spans else trace.NoOpTracer()
+    )
+    return provider, request_tracer, layer_tracer
+
+
+def handle_request(
+    request_tracer: trace.Tracer, layer_tracer: trace.Tracer
+) -> None:
+    with request_tracer.start_as_current_span(
+        "GET /api/v1/films/{film_uuid}", kind=trace.SpanKind.SERVER
+    ) as span:
+        span.set_attribute("http.request_id", "request-id")
+        for layer in LAYERS:
+            with layer_tracer.start_as_current_span(layer):
+                pass
+
+
+def run(requests: int, **options) -> tuple[float, float]:
+    provider, request_tracer, layer_tracer = make_tracers(**options)
+    started, cpu_started = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        handle_request(request_tracer, layer_tracer)
+    elapsed = time.perf_counter() - started
+    if provider:
+        provider.shutdown()
+    cpu_elapsed = time.process_time() - cpu_started
+    return elapsed / requests * 1e6, cpu_elapsed / requests * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    print(f"{'настройка':<32} {'запрос, мкс':>12} {'CPU, мкс':>10}")
+    for name, options in SETTINGS.items():
+        latency, cpu = run(args.requests, **options)
+        print(f"{name:<32} {latency:>12.1f} {cpu:>10.1f}")
@@ -1,9 +1,22 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from opentelemetry import trace
 
-from api.v1.utils import security_jwt
+from api.v1.utils import (
+    ORJSONModelResponse,
+    conditional_response,
+    etag_matches,
+    not_modified_response,
+    security_jwt,
+)
 from schemas import schemas
 from services.film import FilmService, get_film_service
 
@@ -20,7 +33,7 @@ async def get_films(
     payload: dict = Depends(security_jwt),
     params: schemas.FilmParams = Depends(),
     film_service: FilmService = Depends(get_film_service),
-) -> schemas.FilmResponse:
+) -> ORJSONModelResponse:
     """Ручка получения фильмов с фильтрацией по жанру.
 
     Опциональные параметры:
@@ -28,6 +41,8 @@ async def get_films(
     - `page_size`: размер страницы
     - `sort`: сортировка
     - `genre`: жанр (uuid)
+    - `cursor`: курсор следующей страницы из `next_cursor` предыдущего ответа
+    - `with_facets`: вернуть счетчики жанров, рейтинга и типа в `facets`
 
     Вернет 404 ошибку, если жанр не будет найден.
     """
@@ -35,14 +50,26 @@ async def get_films(
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
-    total_pages, films = await film_service.get_films(
-        **params.model_dump(exclude=["genre"]),
-        genre_uuid=params.genre,
-    )
-    return schemas.FilmResponse(
-        **params.model_dump(),
-        total_pages=total_pages,
-        results=films,
+    facets = None
+    if params.with_facets:
+        page, facets = await film_service.get_films_with_facets(
+            **params.model_dump(exclude=["genre", "with_facets"]),
+            genre_uuid=params.genre,
+        )
+    else:
+        page = await film_service.get_films(
+            **params.model_dump(exclude=["genre", "with_facets"]),
+            genre_uuid=params.genre,
+        )
+    total_pages, films, next_cursor = page
+    return ORJSONModelResponse(
+        schemas.FilmResponse(
+            **params.model_dump(),
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            results=films,
+            facets=facets,
+        )
     )
 
 
@@ -56,7 +83,7 @@ async def get_searched_films(
     payload: dict = Depends(security_jwt),
     params: schemas.FilmSearchParams = Depends(),
     film_service: FilmService = Depends(get_film_service),
-) -> schemas.FilmSearchResponse:
+) -> ORJSONModelResponse:
     """Ручка получения фильмов с поиском по названию.
 
     Обязательные параметры:
@@ -66,18 +93,86 @@ async def get_searched_films(
     - `page_number`: номер страницы
     - `page_size`: размер страницы
     - `sort`: сортировка
+    - `cursor`: курсор следующей страницы из `next_cursor` предыдущего ответа
     """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
-    total_pages, films = await film_service.search_films(
+    total_pages, films, next_cursor = await film_service.search_films(
         **params.model_dump(),
     )
-    return schemas.FilmSearchResponse(
-        **params.model_dump(),
-        total_pages=total_pages,
-        results=films,
+    return ORJSONModelResponse(
+        schemas.FilmSearchResponse(
+            **params.model_dump(),
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            results=films,
+        )
+    )
+
+
+@router.get(
+    "/suggest",
+    response_model=list[schemas.FilmSuggestion],
+    summary="Подсказки по названию фильма",
+)
+async def get_film_suggestions(
+    request: Request,
+    payload: dict = Depends(security_jwt),
+    params: schemas.SuggestParams = Depends(),
+    film_service: FilmService = Depends(get_film_service),
+) -> ORJSONModelResponse:
+    """Ручка подсказок для ввода названия фильма.
+
+    Обязательные параметры:
+    - `query`: начало названия (str)
+
+    Возвращает не больше `SUGGEST_SIZE` фильмов без пагинации.
+    """
+    request_id = request.headers.get("X-Request-Id")
+    span = trace.get_current_span()
+    span.set_attribute("http.request_id", request_id)
+
+    return ORJSONModelResponse(
+        await film_service.suggest_films(params.query)
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=schemas.FilmBatchResponse,
+    summary="Получение фильмов по списку uuid",
+)
+async def get_films_batch(
+    request: Request,
+    params: schemas.FilmBatchParams,
+    payload: dict = Depends(security_jwt),
+    film_service: FilmService = Depends(get_film_service),
+) -> ORJSONModelResponse:
+    """Ручка получения фильмов пачкой.
+
+    Обязательные параметры:
+    - `ids`: список uuid фильмов (не больше `MOVIES_BATCH_MAX_SIZE`)
+
+    Фильмы возвращаются в порядке запроса, не найденные uuid
+    перечисляются в `not_found`.
+    """
+    request_id = request.headers.get("X-Request-Id")
+    span = trace.get_current_span()
+    span.set_attribute("http.request_id", request_id)
+
+    films = await film_service.get_films_by_uuids(params.ids)
+    found = {film.id for film in films}
+    return ORJSONModelResponse(
+        schemas.FilmBatchResponse(
+            results=films,
+            not_found=[
+                uuid
+                for uuid in dict.fromkeys(params.ids)
+                if uuid not in found
+            ],
+        )
     )
 
 
@@ -91,21 +186,27 @@ async def get_film_details(
     film_uuid: UUID,
     payload: dict = Depends(security_jwt),
     film_service: FilmService = Depends(get_film_service),
-) -> schemas.Film:
+) -> Response:
     """Ручка получения фильма по uuid.
 
     Обязательные параметры:
     - `film_uuid`: uuid фильма (uuid)
 
-    Вернет 404 ошибку, если фильм не будет найден.
+    Вернет 304, если `If-None-Match` совпадает с `ETag` фильма,
+    и 404 ошибку, если фильм не будет найден.
     """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
+    if request.headers.get("If-None-Match"):
+        etag = await film_service.get_film_etag(film_uuid)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
     film = await film_service.get_film_by_uuid(film_uuid)
     if not film:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Film not found"
         )
-    return film
+    return conditional_response(request, film, schemas.Film)
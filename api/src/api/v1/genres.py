@@ -1,9 +1,21 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from opentelemetry import trace
 
-from api.v1.utils import security_jwt
+from api.v1.utils import (
+    conditional_response,
+    etag_matches,
+    not_modified_response,
+    security_jwt,
+)
 from schemas import schemas
 from services.genre import GenreService, get_genre_service
 
@@ -19,13 +31,22 @@ async def get_genres(
     request: Request,
     payload: dict = Depends(security_jwt),
     genre_service: GenreService = Depends(get_genre_service),
-) -> list[schemas.FilmGenre]:
-    """Ручка получения всех жанров."""
+) -> Response:
+    """Ручка получения всех жанров.
+
+    Вернет 304, если `If-None-Match` совпадает с `ETag` списка жанров.
+    """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
-    return await genre_service.get_all_genres()
+    if request.headers.get("If-None-Match"):
+        etag = await genre_service.get_all_genres_etag()
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+    genres = await genre_service.get_all_genres()
+    return conditional_response(request, genres, list[schemas.FilmGenre])
 
 
 @router.get(
@@ -38,21 +59,27 @@ async def get_genre_details(
     genre_uuid: UUID,
     payload: dict = Depends(security_jwt),
     genre_service: GenreService = Depends(get_genre_service),
-) -> schemas.FilmGenre:
+) -> Response:
     """Ручка получения жанра по uuid.
 
     Обязательные параметры:
     - `genre_uuid`: uuid жанра (uuid)
 
-    Вернет 404 ошибку, если жанр не будет найден.
+    Вернет 304, если `If-None-Match` совпадает с `ETag` жанра,
+    и 404 ошибку, если жанр не будет найден.
     """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
+    if request.headers.get("If-None-Match"):
+        etag = await genre_service.get_genre_etag(genre_uuid)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
     genre = await genre_service.get_genre_by_uuid(genre_uuid)
     if not genre:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Genre not found"
         )
-    return genre
+    return conditional_response(request, genre, schemas.FilmGenre)
@@ -1,9 +1,22 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from opentelemetry import trace
 
-from api.v1.utils import security_jwt
+from api.v1.utils import (
+    ORJSONModelResponse,
+    conditional_response,
+    etag_matches,
+    not_modified_response,
+    security_jwt,
+)
 from schemas import schemas
 from services.person import PersonService, get_person_service
 
@@ -20,7 +33,7 @@ async def get_searched_persons(
     payload: dict = Depends(security_jwt),
     params: schemas.PersonSearchParams = Depends(),
     person_service: PersonService = Depends(get_person_service),
-) -> schemas.PersonSearchResponse:
+) -> ORJSONModelResponse:
     """Ручка получения персон с поиском по имени.
 
     Обязательные параметры:
@@ -29,18 +42,51 @@ async def get_searched_persons(
     Опциональные параметры:
     - `page_number`: номер страницы
     - `page_size`: размер страницы
+    - `cursor`: курсор следующей страницы из `next_cursor` предыдущего ответа
     """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
-    total_pages, persons = await person_service.search_by_full_name(
-        **params.model_dump()
+    (
+        total_pages,
+        persons,
+        next_cursor,
+    ) = await person_service.search_by_full_name(**params.model_dump())
+    return ORJSONModelResponse(
+        schemas.PersonSearchResponse(
+            **params.model_dump(),
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            results=persons,
+        )
     )
-    return schemas.PersonSearchResponse(
-        **params.model_dump(),
-        total_pages=total_pages,
-        results=persons,
+
+
+@router.get(
+    "/suggest",
+    response_model=list[schemas.FilmPerson],
+    summary="Подсказки по имени персоны",
+)
+async def get_person_suggestions(
+    request: Request,
+    payload: dict = Depends(security_jwt),
+    params: schemas.SuggestParams = Depends(),
+    person_service: PersonService = Depends(get_person_service),
+) -> ORJSONModelResponse:
+    """Ручка подсказок для ввода имени персоны.
+
+    Обязательные параметры:
+    - `query`: начало имени (str)
+
+    Возвращает не больше `SUGGEST_SIZE` персон без пагинации.
+    """
+    request_id = request.headers.get("X-Request-Id")
+    span = trace.get_current_span()
+    span.set_attribute("http.request_id", request_id)
+
+    return ORJSONModelResponse(
+        await person_service.suggest_persons(params.query)
     )
 
 
@@ -54,21 +100,71 @@ async def get_person_details(
     person_uuid: UUID,
     payload: dict = Depends(security_jwt),
     person_service: PersonService = Depends(get_person_service),
-) -> schemas.Person:
+) -> Response:
     """Ручка получения персоны по uuid.
 
     Обязательные параметры:
     - `person_uuid`: uuid персоны (uuid)
 
-    Вернет 404 ошибку, если персона не будет найдена.
+    Вернет 304, если `If-None-Match` совпадает с `ETag` персоны,
+    и 404 ошибку, если персона не будет найдена.
     """
     request_id = request.headers.get("X-Request-Id")
     span = trace.get_current_span()
     span.set_attribute("http.request_id", request_id)
 
+    if request.headers.get("If-None-Match"):
+        etag = await person_service.get_person_etag(person_uuid)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
     person = await person_service.get_person_by_uuid(person_uuid)
     if not person:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Person not found"
         )
-    return person
+    return conditional_response(request, person, schemas.Person)
+
+
+@router.get(
+    "/{person_uuid}/films",
+    response_model=schemas.PersonFilmsResponse,
+    summary="Получение фильмов персоны",
+)
+async def get_person_films(
+    request: Request,
+    person_uuid: UUID,
+    payload: dict = Depends(security_jwt),
+    params: schemas.PaginationParams = Depends(),
+    person_service: PersonService = Depends(get_person_service),
+) -> ORJSONModelResponse:
+    """Ручка получения фильмов персоны по uuid.
+
+    Обязательные параметры:
+    - `person_uuid`: uuid персоны (uuid)
+
+    Опциональные параметры:
+    - `page_number`: номер страницы
+    - `page_size`: размер страницы
+
+    Вернет 404 ошибку, если персона не будет найдена.
+    """
+    request_id = request.headers.get("X-Request-Id")
+    span = trace.get_current_span()
+    span.set_attribute("http.request_id", request_id)
+
+    page = await person_service.get_person_films(
+        person_uuid, **params.model_dump()
+    )
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Person not found"
+        )
+    total_pages, films = page
+    return ORJSONModelResponse(
+        schemas.PersonFilmsResponse(
+            **params.model_dump(),
+            total_pages=total_pages,
+            results=films,
+        )
+    )
@@ -1,20 +1,86 @@
-from typing import Optional
+from typing import Any, Optional
 
-from fastapi import HTTPException, Request, status
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer
-from jose import jwt
+import orjson
+from pydantic import BaseModel
 
 from core.config import PUBLIC_KEY, settings
+from core.tokens import VerifiedTokenCache
+from storages.redis_storage import object_etag
+
+token_cache = VerifiedTokenCache(
+    PUBLIC_KEY,
+    audience=settings.app_name,
+    max_size=settings.jwt_cache_max_size,
+    max_lifetime=settings.jwt_cache_max_lifetime,
+)
+
+
+class ORJSONModelResponse(ORJSONResponse):
+    """
+    Ответ из готовых pydantic-моделей.
+
+    Ручка возвращает экземпляр ответа, поэтому FastAPI не валидирует
+    результат повторно по `response_model` и не прогоняет его через
+    `jsonable_encoder`: модели превращаются в словари и сразу
+    сериализуются orjson (uuid и числа поддерживаются нативно).
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            content = content.model_dump()
+        elif isinstance(content, list):
+            content = [
+                item.model_dump() if isinstance(item, BaseModel) else item
+                for item in content
+            ]
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.http_cache_max_age}",
+    }
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Проверка заголовка `If-None-Match` (слабое сравнение)."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not etag or not if_none_match:
+        return False
+    return any(
+        tag.strip().removeprefix("W/") in (etag, "*")
+        for tag in if_none_match.split(",")
+    )
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag)
+    )
+
+
+def conditional_response(
+    request: Request, content: Any, type_: Any
+) -> Response:
+    """Ответ с `ETag` и `Cache-Control` или 304, если клиент уже имеет
+    актуальную версию.
+
+    ETag считается по тем же байтам, что хранятся в кэше, поэтому
+    совпадает с ETag, который ручки проверяют до загрузки объекта.
+    """
+    etag = object_etag(content, type_)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    return ORJSONModelResponse(content, headers=cache_headers(etag))
 
 
 def decode_token(token: str) -> Optional[dict]:
     try:
-        return jwt.decode(
-            token,
-            PUBLIC_KEY,
-            algorithms=["RS256"],
-            audience=settings.app_name,
-        )
+        return token_cache.decode(token)
     except Exception:
         return None
 
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -18,22 +18,102 @@ class Settings(BaseSettings):
     backoff_tries: int = Field(5, alias="BACKOFF_TRIES")
     backoff_time: int = Field(30, alias="BACKOFF_TIME")
 
+    gunicorn_workers: int = Field(0, alias="GUNICORN_WORKERS")
+    gunicorn_max_requests: int = Field(10000, alias="GUNICORN_MAX_REQUESTS")
+    gunicorn_max_requests_jitter: int = Field(
+        1000, alias="GUNICORN_MAX_REQUESTS_JITTER"
+    )
+    gunicorn_graceful_timeout: int = Field(
+        30, alias="GUNICORN_GRACEFUL_TIMEOUT"
+    )
+    gunicorn_keepalive: int = Field(5, alias="GUNICORN_KEEPALIVE")
+
     redis_host: str = Field("localhost", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
     redis_db: int = Field(0, alias="REDIS_DB")
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout: int = Field(5, alias="REDIS_POOL_TIMEOUT")
 
     es_host: str = Field("localhost", alias="ES_HOST")
     es_port: int = Field(9200, alias="ES_PORT")
+    es_connections_per_node: int = Field(
+        25, alias="ES_CONNECTIONS_PER_NODE"
+    )
+    es_max_result_window: int = Field(10000, alias="ES_MAX_RESULT_WINDOW")
+    es_request_timeout: float = Field(5, alias="ES_REQUEST_TIMEOUT")
+
+    # Не больше BACKOFF_TRIES: отказы считаются по попыткам, и автомат
+    # должен разомкнуться раньше, чем повторы запроса закончатся
+    breaker_failure_threshold: int = Field(
+        5, alias="BREAKER_FAILURE_THRESHOLD"
+    )
+    breaker_latency_threshold: float = Field(
+        1, alias="BREAKER_LATENCY_THRESHOLD"
+    )
+    breaker_recovery_timeout: float = Field(
+        10, alias="BREAKER_RECOVERY_TIMEOUT"
+    )
+
+    jwt_cache_max_size: int = Field(10000, alias="JWT_CACHE_MAX_SIZE")
+    jwt_cache_max_lifetime: int = Field(3600, alias="JWT_CACHE_MAX_LIFETIME")
 
     jaeger_host: str = Field("localhost", alias="JAEGER_HOST")
     jaeger_port: int = Field(6831, alias="JAEGER_PORT")
 
+    tracing_enabled: bool = Field(True, alias="TRACING_ENABLED")
+    tracing_exporter: Literal["jaeger", "console"] = Field(
+        "jaeger", alias="TRACING_EXPORTER"
+    )
+    tracing_sample_ratio: float = Field(
+        0.05, ge=0, le=1, alias="TRACING_SAMPLE_RATIO"
+    )
+    tracing_layer_spans: bool = Field(True, alias="TRACING_LAYER_SPANS")
+
+    # Алиасы индексов: при переиндексации ETL переключает их на новые версии
     movies_es_index: str = Field("movies", alias="MOVIES_ES_INDEX")
     movies_cache_lifetime: int = Field(86400, alias="MOVIES_CACHE_LIFETIME")
+    movies_batch_max_size: int = Field(100, alias="MOVIES_BATCH_MAX_SIZE")
     persons_es_index: str = Field("persons", alias="PERSONS_ES_INDEX")
     persons_cache_lifetime: int = Field(86400, alias="PERSONS_CACHE_LIFETIME")
     genres_es_index: str = Field("genres", alias="GENRES_ES_INDEX")
     genres_cache_lifetime: int = Field(86400, alias="GENRES_CACHE_LIFETIME")
+    films_list_cache_lifetime: int = Field(
+        600, alias="FILMS_LIST_CACHE_LIFETIME"
+    )
+    films_search_cache_lifetime: int = Field(
+        300, alias="FILMS_SEARCH_CACHE_LIFETIME"
+    )
+    persons_search_cache_lifetime: int = Field(
+        300, alias="PERSONS_SEARCH_CACHE_LIFETIME"
+    )
+    films_facets_cache_lifetime: int = Field(
+        600, alias="FILMS_FACETS_CACHE_LIFETIME"
+    )
+    facets_size: int = Field(50, alias="FACETS_SIZE")
+    facets_rating_interval: float = Field(
+        1.0, gt=0, alias="FACETS_RATING_INTERVAL"
+    )
+    suggest_size: int = Field(10, alias="SUGGEST_SIZE")
+    suggest_cache_lifetime: int = Field(60, alias="SUGGEST_CACHE_LIFETIME")
+
+    local_cache_max_items: int = Field(10000, alias="LOCAL_CACHE_MAX_ITEMS")
+    local_cache_max_bytes: int = Field(
+        64 * 1024 * 1024, alias="LOCAL_CACHE_MAX_BYTES"
+    )
+    local_cache_lifetime: int = Field(60, alias="LOCAL_CACHE_LIFETIME")
+    cache_invalidation_channel: str = Field(
+        "cache-invalidation", alias="CACHE_INVALIDATION_CHANNEL"
+    )
+    cache_stale_lifetime: int = Field(3600, alias="CACHE_STALE_LIFETIME")
+    cache_swr_window: int = Field(30, alias="CACHE_SWR_WINDOW")
+    cache_lock_enabled: bool = Field(False, alias="CACHE_LOCK_ENABLED")
+    cache_lock_timeout: int = Field(10, alias="CACHE_LOCK_TIMEOUT")
+    cache_lock_wait: int = Field(5, alias="CACHE_LOCK_WAIT")
+    http_cache_max_age: int = Field(60, alias="HTTP_CACHE_MAX_AGE")
+
+    metrics_sample_interval: float = Field(
+        5, alias="METRICS_SAMPLE_INTERVAL"
+    )
 
     @property
     def redis_dsn(self) -> str:
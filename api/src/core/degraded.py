@@ -0,0 +1,26 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from core.metrics import DEGRADED_RESPONSES
+
+_degraded: ContextVar[Optional[set[str]]] = ContextVar(
+    "degraded", default=None
+)
+
+
+def track_degraded() -> set[str]:
+    """Начало учета деградации для запроса.
+
+    Возвращает изменяемый набор хранилищ, вместо которых отдавались
+    устаревшие данные. Набор общий для задач, созданных после вызова,
+    поэтому его видит и middleware, и обработчик запроса.
+    """
+    storages: set[str] = set()
+    _degraded.set(storages)
+    return storages
+
+
+def mark_degraded(storage: str) -> None:
+    DEGRADED_RESPONSES.labels(storage).inc()
+    if (storages := _degraded.get()) is not None:
+        storages.add(storage)
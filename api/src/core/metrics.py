@@ -0,0 +1,103 @@
+import asyncio
+import os
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Время обработки запроса",
+    ["method", "route", "status"],
+)
+ES_LATENCY = Histogram(
+    "api_elasticsearch_duration_seconds",
+    "Время ответа Elasticsearch",
+    ["index", "method"],
+)
+ES_IN_PROGRESS = Gauge(
+    "api_elasticsearch_requests_in_progress",
+    "Выполняющиеся запросы к Elasticsearch",
+    multiprocess_mode="livesum",
+)
+ES_POOL_SIZE = Gauge(
+    "api_elasticsearch_pool_size",
+    "Размер пулов соединений с Elasticsearch",
+    multiprocess_mode="livesum",
+)
+REDIS_LATENCY = Histogram(
+    "api_redis_duration_seconds",
+    "Время ответа Redis",
+    ["command"],
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "api_redis_pool_connections",
+    "Соединения пулов Redis: используемые, свободные, максимум",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "api_cache_requests_total",
+    "Обращения к уровням кэша",
+    ["tier", "result"],
+)
+LOCAL_CACHE_ITEMS = Gauge(
+    "api_local_cache_items",
+    "Записи локального кэша воркеров",
+    multiprocess_mode="livesum",
+)
+LOCAL_CACHE_BYTES = Gauge(
+    "api_local_cache_bytes",
+    "Объем локального кэша воркеров",
+    multiprocess_mode="livesum",
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "api_circuit_breaker_state",
+    "Состояние автомата хранилища: 0 - замкнут, 1 - полуоткрыт, 2 - разомкнут",
+    ["storage"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_FAILURES = Counter(
+    "api_circuit_breaker_failures_total",
+    "Ошибки и медленные ответы хранилища, учтенные автоматом",
+    ["storage"],
+)
+DEGRADED_RESPONSES = Counter(
+    "api_degraded_responses_total",
+    "Ответы из устаревшей копии кэша при недоступном хранилище",
+    ["storage"],
+)
+
+
+def make_metrics_app():
+    """ASGI-приложение `/metrics`.
+
+    Под gunicorn метрики воркеров пишутся в `PROMETHEUS_MULTIPROC_DIR`
+    и собираются со всех процессов, иначе отдается реестр процесса.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return make_asgi_app()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry=registry)
+
+
+async def sample_pools(redis_pool, local_cache, interval: float) -> None:
+    """Периодический снимок заполненности пула Redis и локального кэша."""
+    while True:
+        in_use = len(redis_pool._in_use_connections)
+        REDIS_POOL_CONNECTIONS.labels("in_use").set(in_use)
+        REDIS_POOL_CONNECTIONS.labels("free").set(
+            redis_pool.max_connections - in_use
+        )
+        REDIS_POOL_CONNECTIONS.labels("max").set(redis_pool.max_connections)
+        LOCAL_CACHE_ITEMS.set(len(local_cache))
+        LOCAL_CACHE_BYTES.set(local_cache.size)
+        await asyncio.sleep(interval)
@@ -0,0 +1,42 @@
+from opentelemetry import trace
+from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from core.config import settings
+
+
+def get_exporter() -> SpanExporter:
+    if settings.tracing_exporter == "console":
+        return ConsoleSpanExporter()
+    return JaegerExporter(
+        agent_host_name=settings.jaeger_host,
+        agent_port=settings.jaeger_port,
+        udp_split_oversized_batches=True,
+    )
+
+
+def configure_tracer() -> None:
+    tracer_provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+        resource=Resource.create({SERVICE_NAME: settings.app_name}),
+    )
+    tracer_provider.add_span_processor(BatchSpanProcessor(get_exporter()))
+    trace.set_tracer_provider(tracer_provider)
+
+
+def get_tracer(name: str) -> trace.Tracer:
+    """Трейсер слоя (сервисы, хранилища, кэш).
+
+    При выключенных `TRACING_LAYER_SPANS` спаны слоев не создаются,
+    остается только спан запроса.
+    """
+    if settings.tracing_enabled and settings.tracing_layer_spans:
+        return trace.get_tracer(name)
+    return trace.NoOpTracer()
@@ -0,0 +1,9 @@
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """
+    Воркер uvicorn с событийным циклом uvloop и http-парсером httptools
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
@@ -1,5 +1,29 @@
+import multiprocessing
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+from core.config import settings
+
 bind = "0.0.0.0:5000"
-worker_class = "uvicorn.workers.UvicornWorker"
-workers = 1
+worker_class = "core.workers.ProductionUvicornWorker"
+workers = settings.gunicorn_workers or multiprocessing.cpu_count()
+max_requests = settings.gunicorn_max_requests
+max_requests_jitter = settings.gunicorn_max_requests_jitter
+graceful_timeout = settings.gunicorn_graceful_timeout
+keepalive = settings.gunicorn_keepalive
 accesslog = "logs/gunicorn/access.log"
 loglevel = "INFO"
+
+
+def on_starting(server):
+    # Метрики прошлого запуска не должны попасть в новые счетчики
+    if metrics_dir := os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
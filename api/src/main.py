@@ -1,88 +1,142 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+import time
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import APIRouter, FastAPI, Request, status
 from fastapi.exceptions import ValidationException
 from fastapi.responses import JSONResponse
 from loguru import logger
-from opentelemetry import trace
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 from redis.backoff import ExponentialBackoff
 from redis.exceptions import BusyLoadingError, ConnectionError, TimeoutError
 from redis.retry import Retry
 
 from api.v1 import films, genres, persons
 from core.config import settings
+from core.degraded import track_degraded
 from core.loggers import LOGGER_DEBUG, LOGGER_ERROR
-from storages import elastic, redis_storage
+from core.metrics import (
+    ES_POOL_SIZE,
+    REQUEST_LATENCY,
+    make_metrics_app,
+    sample_pools,
+)
+from core.tracing import configure_tracer
+from storages import elastic, local_cache, redis_storage
+from storages.circuit_breaker import StorageUnavailableError
 
 logger.add(**LOGGER_DEBUG)
 logger.add(**LOGGER_ERROR)
 
 
-def configure_tracer() -> None:
-    trace.set_tracer_provider(TracerProvider())
-    trace.get_tracer_provider().add_span_processor(
-        BatchSpanProcessor(
-            JaegerExporter(
-                agent_host_name=settings.jaeger_host,
-                agent_port=settings.jaeger_port,
-            )
-        )
-    )
-    trace.get_tracer_provider().add_span_processor(
-        BatchSpanProcessor(ConsoleSpanExporter())
-    )
-
-
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    redis_storage.rds = Redis.from_url(
+    # Пулы соединений рассчитаны на один воркер gunicorn
+    redis_pool = BlockingConnectionPool.from_url(
         url=settings.redis_dsn,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
         retry=Retry(
             backoff=ExponentialBackoff(),
             retries=settings.backoff_tries,
             supported_errors=(BusyLoadingError, ConnectionError, TimeoutError),
         ),
     )
-    elastic.esm = AsyncElasticsearch(hosts=[settings.es_dsn])
+    redis_storage.rds = Redis(connection_pool=redis_pool)
+    es_hosts = [settings.es_dsn]
+    elastic.esm = AsyncElasticsearch(
+        hosts=es_hosts,
+        connections_per_node=settings.es_connections_per_node,
+        request_timeout=settings.es_request_timeout,
+    )
+    local_cache.local = local_cache.LocalCache(
+        max_items=settings.local_cache_max_items,
+        max_bytes=settings.local_cache_max_bytes,
+        lifetime=settings.local_cache_lifetime,
+    )
+    invalidation_listener = asyncio.create_task(
+        redis_storage.listen_invalidations(
+            redis_storage.rds, local_cache.local
+        )
+    )
+    ES_POOL_SIZE.set(settings.es_connections_per_node * len(es_hosts))
+    pools_sampler = asyncio.create_task(
+        sample_pools(
+            redis_pool, local_cache.local, settings.metrics_sample_interval
+        )
+    )
 
     yield
 
+    for task in (invalidation_listener, pools_sampler):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await elastic.esm.close()
     await redis_storage.rds.aclose()
+    await redis_pool.disconnect()
 
 
-configure_tracer()
 app = FastAPI(title="PRACTIX", lifespan=lifespan)
-FastAPIInstrumentor.instrument_app(app)
+if settings.tracing_enabled:
+    configure_tracer()
+    FastAPIInstrumentor.instrument_app(app)
 
 v1_router = APIRouter(prefix="/api/v1")
 v1_router.include_router(router=films.router)
 v1_router.include_router(router=genres.router)
 v1_router.include_router(router=persons.router)
 app.include_router(router=v1_router)
+app.mount("/metrics", make_metrics_app())
 
 
 @app.middleware("http")
 async def before_request(request: Request, call_next):
+    if request.url.path.startswith("/metrics"):
+        return await call_next(request)
+
     request_id = request.headers.get("X-Request-Id")
     if not request_id:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"detail": "X-Request-Id is required"},
         )
+    degraded = track_degraded()
+    started = time.perf_counter()
     response = await call_next(request)
+    if degraded:
+        response.headers["X-Degraded"] = "true"
+
+    # Шаблон пути маршрута, а не сам путь: uuid не раздувают метрику
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_LATENCY.labels(
+        request.method, route, response.status_code
+    ).observe(time.perf_counter() - started)
     return response
 
 
+@app.exception_handler(elastic.InvalidCursorError)
+async def invalid_cursor_handler(_: Request, exc: elastic.InvalidCursorError):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": "Invalid cursor"},
+    )
+
+
+@app.exception_handler(StorageUnavailableError)
+async def storage_unavailable_handler(
+    _: Request, exc: StorageUnavailableError
+):
+    logger.error(f"Storage '{exc.storage}' is unavailable")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(int(settings.breaker_recovery_timeout))},
+        content={"detail": "Service temporarily unavailable"},
+    )
+
+
 @app.exception_handler(ValidationException)
 async def validation_error_handler(_: Request, exc: ValidationException):
     logger.error(exc)
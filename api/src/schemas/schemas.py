@@ -3,6 +3,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from core.config import settings
+
 # === Enums ===
 
 
@@ -46,6 +48,34 @@ class Person(FilmPerson):
     films: list[Film] = []
 
 
+class FilmSuggestion(CustomBaseModel):
+    id: UUID
+    title: str
+
+
+class GenreFacet(CustomBaseModel):
+    id: UUID
+    name: str
+    count: int
+
+
+class RatingFacet(CustomBaseModel):
+    rating_from: float
+    rating_to: float
+    count: int
+
+
+class TypeFacet(CustomBaseModel):
+    type: str
+    count: int
+
+
+class FilmFacets(CustomBaseModel):
+    genres: list[GenreFacet] = []
+    ratings: list[RatingFacet] = []
+    types: list[TypeFacet] = []
+
+
 # === Params ===
 
 
@@ -54,22 +84,37 @@ class PaginationParams(CustomBaseModel):
     page_size: int = Field(default=10, gt=0)
 
 
+class CursorPaginationParams(PaginationParams):
+    cursor: str | None = None
+
+
 class SortParams(CustomBaseModel):
     sort: Sort = Sort.imdb_desc
 
 
-class FilmParams(SortParams, PaginationParams):
+class FilmParams(SortParams, CursorPaginationParams):
     genre: UUID | None = None
+    with_facets: bool = False
 
 
-class FilmSearchParams(SortParams, PaginationParams):
+class FilmSearchParams(SortParams, CursorPaginationParams):
     query: str
 
 
-class PersonSearchParams(PaginationParams):
+class PersonSearchParams(CursorPaginationParams):
     query: str
 
 
+class SuggestParams(CustomBaseModel):
+    query: str = Field(min_length=1, max_length=100)
+
+
+class FilmBatchParams(CustomBaseModel):
+    ids: list[UUID] = Field(
+        min_length=1, max_length=settings.movies_batch_max_size
+    )
+
+
 # === Responses ===
 
 
@@ -77,14 +122,28 @@ class PaginationResponse(PaginationParams):
     total_pages: int
 
 
-class FilmResponse(SortParams, PaginationResponse):
+class CursorPaginationResponse(CursorPaginationParams, PaginationResponse):
+    next_cursor: str | None = None
+
+
+class FilmResponse(SortParams, CursorPaginationResponse):
     genre: UUID | None = None
     results: list[Film]
+    facets: FilmFacets | None = None
+
+
+class FilmSearchResponse(FilmSearchParams, CursorPaginationResponse):
+    results: list[Film]
 
 
-class FilmSearchResponse(FilmSearchParams, PaginationResponse):
+class FilmBatchResponse(CustomBaseModel):
     results: list[Film]
+    not_found: list[UUID] = []
 
 
-class PersonSearchResponse(PersonSearchParams, PaginationResponse):
+class PersonSearchResponse(PersonSearchParams, CursorPaginationResponse):
     results: list[FilmPerson]
+
+
+class PersonFilmsResponse(PaginationResponse):
+    results: list[Film]
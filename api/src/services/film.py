@@ -3,14 +3,18 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends
-from opentelemetry import trace
 
 from core.config import settings
-from schemas.schemas import Film, Sort
+from core.degraded import mark_degraded
+from core.tracing import get_tracer
+from schemas.schemas import Film, FilmFacets, FilmSuggestion, Sort
+from storages.circuit_breaker import StorageUnavailableError
 from storages.elastic import FilmStorage, get_film_storge
-from storages.redis_storage import RedisCache, get_cache
+from storages.redis_storage import RedisCache, get_cache, make_cache_key
 
-tracer = trace.get_tracer(__name__)
+tracer = get_tracer(__name__)
+
+FilmPage = tuple[int, list[Film], Optional[str]]
 
 
 class FilmService:
@@ -20,19 +24,45 @@ class FilmService:
 
     async def get_film_by_uuid(self, uuid: UUID) -> Optional[Film]:
         with tracer.start_as_current_span("service"):
-            if film := await self.cache.get(str(uuid)):
-                film = Film.model_validate_json(film)
-            else:
-                film = await self.storage.get_by_id(uuid)
-                if not film:
-                    return None
-
-                await self.cache.put(
-                    str(uuid),
-                    film.model_dump_json(),
-                    ex=settings.movies_cache_lifetime,
-                )
-            return film
+            return await self.cache.get_or_fetch(
+                str(uuid),
+                Film,
+                lambda: self.storage.get_by_id(uuid),
+                ex=settings.movies_cache_lifetime,
+            )
+
+    async def get_film_etag(self, uuid: UUID) -> Optional[str]:
+        return await self.cache.get_etag(str(uuid))
+
+    async def get_films_by_uuids(self, uuids: list[UUID]) -> list[Film]:
+        """Получение фильмов пачкой.
+
+        Кэш читается одним MGET, из ES одним mget запрашиваются только
+        промахи, которые затем пишутся в кэш одним конвейером. При
+        недоступном ES промахи берутся из копий кэша, если копии есть
+        для всех.
+        """
+        with tracer.start_as_current_span("service"):
+            keys = list(dict.fromkeys(str(uuid) for uuid in uuids))
+            films = dict(zip(keys, await self.cache.get_objects(keys, Film)))
+
+            if missed := [key for key, film in films.items() if film is None]:
+                try:
+                    fetched = await self.storage.get_by_ids(missed)
+                except StorageUnavailableError as error:
+                    stale = await self.cache.get_stale_objects(missed, Film)
+                    if None in stale:
+                        raise
+                    mark_degraded(error.storage)
+                    fetched = dict(zip(missed, stale))
+                else:
+                    if fetched:
+                        await self.cache.put_objects(
+                            fetched, Film, ex=settings.movies_cache_lifetime
+                        )
+                films |= fetched
+
+            return [film for film in films.values() if film is not None]
 
     async def get_films(
         self,
@@ -40,12 +70,84 @@ class FilmService:
         page_size: int,
         sort: Sort,
         genre_uuid: UUID | None = None,
-    ) -> tuple[int, list[Optional[Film]]]:
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[Film]], Optional[str]]:
         with tracer.start_as_current_span("service"):
-            total_pages, films = await self.storage.get_films(
-                page_number, page_size, sort, genre_uuid
+            generation = await self.cache.get_generation(
+                settings.movies_es_index
+            )
+            cache_key = self._films_cache_key(
+                generation, page_number, page_size, sort, genre_uuid, cursor
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                FilmPage,
+                lambda: self.storage.get_films(
+                    page_number, page_size, sort, genre_uuid, cursor
+                ),
+                ex=settings.films_list_cache_lifetime,
+            )
+
+    async def get_films_with_facets(
+        self,
+        page_number: int,
+        page_size: int,
+        sort: Sort,
+        genre_uuid: UUID | None = None,
+        cursor: str | None = None,
+    ) -> tuple[FilmPage, FilmFacets]:
+        """Страница фильмов с фасетами (жанры, рейтинг, тип).
+
+        Фасеты не зависят от страницы и сортировки и кэшируются по набору
+        фильтров. При промахе страница и фасеты считаются одним запросом
+        к ES и обе записи попадают в кэш.
+        """
+        with tracer.start_as_current_span("service"):
+            generation = await self.cache.get_generation(
+                settings.movies_es_index
+            )
+            facets_key = make_cache_key(
+                "films_facets", generation, genre=genre_uuid
             )
-            return total_pages, films
+            facets = await self.cache.get_object(facets_key, FilmFacets)
+            if facets is not None:
+                page = await self.get_films(
+                    page_number, page_size, sort, genre_uuid, cursor
+                )
+                return page, facets
+
+            try:
+                page, facets = await self.storage.get_films_with_facets(
+                    page_number, page_size, sort, genre_uuid, cursor
+                )
+            except StorageUnavailableError as error:
+                facets = await self.cache.get_stale_object(
+                    facets_key, FilmFacets
+                )
+                if facets is None:
+                    raise
+                mark_degraded(error.storage)
+                page = await self.get_films(
+                    page_number, page_size, sort, genre_uuid, cursor
+                )
+                return page, facets
+
+            cache_key = self._films_cache_key(
+                generation, page_number, page_size, sort, genre_uuid, cursor
+            )
+            await self.cache.put_object(
+                cache_key,
+                page,
+                FilmPage,
+                ex=settings.films_list_cache_lifetime,
+            )
+            await self.cache.put_object(
+                facets_key,
+                facets,
+                FilmFacets,
+                ex=settings.films_facets_cache_lifetime,
+            )
+            return page, facets
 
     async def search_films(
         self,
@@ -53,12 +155,63 @@ class FilmService:
         page_size: int,
         query: str,
         sort: Sort,
-    ) -> tuple[int, list[Optional[Film]]]:
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[Film]], Optional[str]]:
         with tracer.start_as_current_span("service"):
-            total_pages, films = await self.storage.search_films(
-                page_number, page_size, query, sort
+            generation = await self.cache.get_generation(
+                settings.movies_es_index
+            )
+            cache_key = make_cache_key(
+                "films_search",
+                generation,
+                query=query,
+                sort=sort,
+                page_number=page_number,
+                page_size=page_size,
+                cursor=cursor,
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                FilmPage,
+                lambda: self.storage.search_films(
+                    page_number, page_size, query, sort, cursor
+                ),
+                ex=settings.films_search_cache_lifetime,
             )
-            return total_pages, films
+
+    async def suggest_films(self, query: str) -> list[FilmSuggestion]:
+        with tracer.start_as_current_span("service"):
+            generation = await self.cache.get_generation(
+                settings.movies_es_index
+            )
+            cache_key = make_cache_key(
+                "films_suggest", generation, query=query
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                list[FilmSuggestion],
+                lambda: self.storage.suggest_films(query),
+                ex=settings.suggest_cache_lifetime,
+            )
+
+    @staticmethod
+    def _films_cache_key(
+        generation: int,
+        page_number: int,
+        page_size: int,
+        sort: Sort,
+        genre_uuid: UUID | None = None,
+        cursor: str | None = None,
+    ) -> str:
+        return make_cache_key(
+            "films",
+            generation,
+            genre=genre_uuid,
+            sort=sort,
+            page_number=page_number,
+            page_size=page_size,
+            cursor=cursor,
+        )
 
 
 @lru_cache()
@@ -1,17 +1,16 @@
 from functools import lru_cache
-import json
 from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends
-from opentelemetry import trace
 
 from core.config import settings
+from core.tracing import get_tracer
 from schemas.schemas import FilmGenre
 from storages.elastic import GenreStorage, get_genre_storge
 from storages.redis_storage import RedisCache, get_cache
 
-tracer = trace.get_tracer(__name__)
+tracer = get_tracer(__name__)
 
 
 class GenreService:
@@ -21,37 +20,27 @@ class GenreService:
 
     async def get_genre_by_uuid(self, uuid: UUID) -> Optional[FilmGenre]:
         with tracer.start_as_current_span("service"):
-            if genre := await self.cache.get(str(uuid)):
-                genre = FilmGenre.model_validate_json(genre)
-            else:
-                genre = await self.storage.get_by_id(uuid)
-                if not genre:
-                    return None
-
-                await self.cache.put(
-                    str(uuid),
-                    genre.model_dump_json(),
-                    settings.genres_cache_lifetime,
-                )
-            return genre
+            return await self.cache.get_or_fetch(
+                str(uuid),
+                FilmGenre,
+                lambda: self.storage.get_by_id(uuid),
+                ex=settings.genres_cache_lifetime,
+            )
+
+    async def get_genre_etag(self, uuid: UUID) -> Optional[str]:
+        return await self.cache.get_etag(str(uuid))
+
+    async def get_all_genres_etag(self) -> Optional[str]:
+        return await self.cache.get_etag("genres:all")
 
     async def get_all_genres(self) -> list[Optional[FilmGenre]]:
         with tracer.start_as_current_span("service"):
-            genres_cache_key = "es_all_genres"
-            if genres := await self.cache.get(genres_cache_key):
-                genres = json.loads(genres)
-                genres = [
-                    FilmGenre.model_validate_json(genre) for genre in genres
-                ]
-            else:
-                genres = await self.storage.get_all_genres()
-
-                await self.cache.put(
-                    genres_cache_key,
-                    json.dumps([genre.model_dump_json() for genre in genres]),
-                    settings.genres_cache_lifetime,
-                )
-            return genres
+            return await self.cache.get_or_fetch(
+                "genres:all",
+                list[FilmGenre],
+                self.storage.get_all_genres,
+                ex=settings.genres_cache_lifetime,
+            )
 
 
 @lru_cache()
@@ -3,14 +3,17 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends
-from opentelemetry import trace
 
 from core.config import settings
-from schemas.schemas import FilmPerson, Person
+from core.tracing import get_tracer
+from schemas.schemas import Film, FilmPerson, Person
 from storages.elastic import PersonStorage, get_person_storge
-from storages.redis_storage import RedisCache, get_cache
+from storages.redis_storage import RedisCache, get_cache, make_cache_key
 
-tracer = trace.get_tracer(__name__)
+tracer = get_tracer(__name__)
+
+PersonPage = tuple[int, list[FilmPerson], Optional[str]]
+PersonFilmsPage = tuple[int, list[Film]]
 
 
 class PersonService:
@@ -20,28 +23,81 @@ class PersonService:
 
     async def get_person_by_uuid(self, uuid: UUID) -> Optional[Person]:
         with tracer.start_as_current_span("service"):
-            if person := await self.cache.get(str(uuid)):
-                person = Person.model_validate_json(person)
-            else:
-                person = await self.storage.get_by_id(uuid)
-                if not person:
-                    return None
-
-                await self.cache.put(
-                    str(uuid),
-                    person.model_dump_json(),
-                    settings.persons_cache_lifetime,
-                )
-            return person
+            return await self.cache.get_or_fetch(
+                str(uuid),
+                Person,
+                lambda: self.storage.get_by_id(uuid),
+                ex=settings.persons_cache_lifetime,
+            )
+
+    async def get_person_etag(self, uuid: UUID) -> Optional[str]:
+        return await self.cache.get_etag(str(uuid))
+
+    async def get_person_films(
+        self, uuid: UUID, page_number: int, page_size: int
+    ) -> Optional[PersonFilmsPage]:
+        with tracer.start_as_current_span("service"):
+            generation = await self.cache.get_generation(
+                settings.persons_es_index
+            )
+            cache_key = make_cache_key(
+                "person_films",
+                generation,
+                person=uuid,
+                page_number=page_number,
+                page_size=page_size,
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                PersonFilmsPage,
+                lambda: self.storage.get_person_films(
+                    uuid, page_number, page_size
+                ),
+                ex=settings.persons_cache_lifetime,
+            )
 
     async def search_by_full_name(
-        self, page_number: int, page_size: int, query: str
-    ) -> tuple[int, list[Optional[FilmPerson]]]:
+        self,
+        page_number: int,
+        page_size: int,
+        query: str,
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[FilmPerson]], Optional[str]]:
         with tracer.start_as_current_span("service"):
-            total_pages, persons = await self.storage.search_by_full_name(
-                page_number, page_size, query
+            generation = await self.cache.get_generation(
+                settings.persons_es_index
+            )
+            cache_key = make_cache_key(
+                "persons_search",
+                generation,
+                query=query,
+                page_number=page_number,
+                page_size=page_size,
+                cursor=cursor,
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                PersonPage,
+                lambda: self.storage.search_by_full_name(
+                    page_number, page_size, query, cursor
+                ),
+                ex=settings.persons_search_cache_lifetime,
+            )
+
+    async def suggest_persons(self, query: str) -> list[FilmPerson]:
+        with tracer.start_as_current_span("service"):
+            generation = await self.cache.get_generation(
+                settings.persons_es_index
+            )
+            cache_key = make_cache_key(
+                "persons_suggest", generation, query=query
+            )
+            return await self.cache.get_or_fetch(
+                cache_key,
+                list[FilmPerson],
+                lambda: self.storage.suggest_persons(query),
+                ex=settings.suggest_cache_lifetime,
             )
-            return total_pages, persons
 
 
 @lru_cache()
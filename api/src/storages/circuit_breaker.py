@@ -0,0 +1,154 @@
+from enum import IntEnum
+from functools import lru_cache, wraps
+import time
+from typing import Any, Awaitable, Callable
+
+from elasticsearch import ApiError, ConnectionError, ConnectionTimeout
+
+from core.config import settings
+from core.metrics import CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_STATE
+
+
+# Ответы перегруженного кластера: отклонение запросов из-за переполненных
+# очередей и недоступность шардов
+OVERLOAD_STATUS_CODES = frozenset({429, 503})
+
+
+class StorageUnavailableError(Exception):
+    """
+    Хранилище недоступно или отвечает слишком медленно
+    """
+
+    def __init__(self, storage: str):
+        super().__init__(storage)
+        self.storage = storage
+
+
+class CircuitOpenError(StorageUnavailableError):
+    """
+    Запрос отклонен разомкнутым автоматом без обращения к хранилищу
+    """
+
+
+class BreakerState(IntEnum):
+    closed = 0
+    half_open = 1
+    open = 2
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты хранилища.
+
+    Ошибки соединения, ответы 429/503 и ответы дольше
+    `latency_threshold` секунд считаются отказами. После
+    `failure_threshold` отказов подряд автомат размыкается и
+    `recovery_timeout` секунд сразу отклоняет запросы, затем пропускает
+    один пробный: при успехе замыкается, при отказе снова размыкается.
+
+    Автомат оборачивает каждую попытку внутри `backoff`: ошибки
+    соединения пробрасываются как есть и повторяются, а после
+    размыкания `CircuitOpenError` прекращает повторы.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        latency_threshold: float,
+        recovery_timeout: float,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = BreakerState.closed
+        self._probe_in_flight = False
+        CIRCUIT_BREAKER_STATE.labels(name).set(self.state)
+
+    async def call(
+        self, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except ConnectionError as error:
+            self._on_failure()
+            if self.state is BreakerState.open:
+                raise CircuitOpenError(self.name) from error
+            raise
+        except ConnectionTimeout as error:
+            self._on_failure()
+            raise StorageUnavailableError(self.name) from error
+        except ApiError as error:
+            if error.status_code not in OVERLOAD_STATUS_CODES:
+                self._probe_in_flight = False
+                raise
+            self._on_failure()
+            if self.state is BreakerState.open:
+                raise CircuitOpenError(self.name) from error
+            raise StorageUnavailableError(self.name) from error
+        except BaseException:
+            self._probe_in_flight = False
+            raise
+
+        if time.monotonic() - started > self.latency_threshold:
+            self._on_failure()
+        else:
+            self._on_success()
+        return result
+
+    def _before_call(self) -> None:
+        if self.state is BreakerState.open:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise CircuitOpenError(self.name)
+            self._set_state(BreakerState.half_open)
+
+        if self.state is BreakerState.half_open:
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name)
+            self._probe_in_flight = True
+
+    def _on_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state is not BreakerState.closed:
+            self._set_state(BreakerState.closed)
+
+    def _on_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        CIRCUIT_BREAKER_FAILURES.labels(self.name).inc()
+        if (
+            self.state is BreakerState.half_open
+            or self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._set_state(BreakerState.open)
+
+    def _set_state(self, state: BreakerState) -> None:
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(state)
+
+
+def circuit_breaker(func: Callable[..., Awaitable[Any]]):
+    """Вызов метода хранилища через его автомат `self.breaker`."""
+
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        return await self.breaker.call(func, self, *args, **kwargs)
+
+    return wrapper
+
+
+@lru_cache()
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_threshold=settings.breaker_failure_threshold,
+        latency_threshold=settings.breaker_latency_threshold,
+        recovery_timeout=settings.breaker_recovery_timeout,
+    )
@@ -1,29 +1,180 @@
 from abc import ABC, abstractmethod
+import base64
+import binascii
 from functools import lru_cache
+import json
 from typing import Any, Optional
 from uuid import UUID
 
 import backoff
 from elasticsearch import AsyncElasticsearch, ConnectionError, NotFoundError
-from opentelemetry import trace
 
 from core import config
-from schemas.schemas import Film, FilmGenre, FilmPerson, Person, Sort
-
-tracer = trace.get_tracer(__name__)
+from core.metrics import ES_IN_PROGRESS, ES_LATENCY
+from core.tracing import get_tracer
+from schemas.schemas import (
+    Film,
+    FilmFacets,
+    FilmGenre,
+    FilmPerson,
+    FilmSuggestion,
+    GenreFacet,
+    Person,
+    RatingFacet,
+    Sort,
+    TypeFacet,
+)
+from storages.circuit_breaker import circuit_breaker, get_circuit_breaker
+
+tracer = get_tracer(__name__)
 
 esm: Optional[AsyncElasticsearch] = None
 
 
+class InvalidCursorError(ValueError):
+    """
+    Некорректный курсор пагинации
+    """
+
+
+def encode_cursor(sort_values: list) -> str:
+    return base64.urlsafe_b64encode(
+        json.dumps(sort_values, separators=(",", ":")).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str, sort_size: int) -> list:
+    """Значения сортировки из курсора: по одному скаляру на поле `sort`."""
+    try:
+        sort_values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursorError(cursor)
+    if (
+        not isinstance(sort_values, list)
+        or len(sort_values) != sort_size
+        or not all(
+            isinstance(value, (str, int, float))
+            and not isinstance(value, bool)
+            for value in sort_values
+        )
+    ):
+        raise InvalidCursorError(cursor)
+    return sort_values
+
+
 class ABCStorage(ABC):
     """
     Абстрактный класс хранилища
     """
 
+    es_client: AsyncElasticsearch
+    index_name: str
+
     @abstractmethod
     async def get_by_id(self, uuid: UUID) -> Any | None:
         raise NotImplemented
 
+    async def _request(self, method: str, **kwargs) -> Any:
+        """Вызов метода клиента ES с учетом времени ответа и числа
+        выполняющихся запросов."""
+        latency = ES_LATENCY.labels(kwargs["index"], method)
+        with ES_IN_PROGRESS.track_inprogress(), latency.time():
+            return await getattr(self.es_client, method)(**kwargs)
+
+    async def _search_page(
+        self,
+        query: dict,
+        sort: list[dict],
+        page_number: int,
+        page_size: int,
+        cursor: str | None = None,
+        aggs: dict | None = None,
+    ) -> tuple[int, list[dict], Optional[str], dict]:
+        """Получение страницы документов за один запрос к ES.
+
+        При переданном `cursor` страница запрашивается через `search_after`,
+        для неглубоких страниц используется `from`/`size`. Страницы за
+        пределами `max_result_window` достигаются пропуском документов
+        через `search_after` без загрузки `_source`, scroll-контексты
+        не открываются. Агрегации `aggs` считаются в том же запросе,
+        что и страница.
+        """
+        search_after = decode_cursor(cursor, len(sort)) if cursor else None
+        offset = 0 if search_after else (page_number - 1) * page_size
+        max_window = config.settings.es_max_result_window
+
+        # С search_after параметр from должен быть равен 0: после первого
+        # пропуска смещение пропускается целиком
+        while offset and (search_after or offset + page_size > max_window):
+            skip_size = min(offset, max_window)
+            skipped = await self._request(
+                "search",
+                index=self.index_name,
+                query=query,
+                sort=sort,
+                size=skip_size,
+                source=False,
+                track_total_hits=False,
+                search_after=search_after,
+            )
+            hits = skipped["hits"]["hits"]
+            if len(hits) < skip_size:
+                # Страница за пределами выдачи: пустая, но с общим числом
+                # страниц, как и для неглубоких страниц
+                total = await self._request(
+                    "count", index=self.index_name, query=query
+                )
+                return -(-total["count"] // page_size), [], None, {}
+            search_after = hits[-1]["sort"]
+            offset -= skip_size
+
+        documents = await self._request(
+            "search",
+            index=self.index_name,
+            query=query,
+            sort=sort,
+            size=page_size,
+            from_=offset or None,
+            search_after=search_after,
+            aggs=aggs,
+            track_total_hits=True,
+        )
+
+        total_values = documents["hits"]["total"]["value"]
+        total_pages = -(-total_values // page_size)
+        hits = documents["hits"]["hits"]
+        next_cursor = (
+            encode_cursor(hits[-1]["sort"]) if len(hits) == page_size else None
+        )
+        return (
+            total_pages,
+            [hit["_source"] for hit in hits],
+            next_cursor,
+            documents.get("aggregations", {}),
+        )
+
+    async def _suggest(
+        self, field: str, query: str, source: list[str], sort: list[dict]
+    ) -> list[dict]:
+        """Подсказки по edge-ngram подполю `suggest`.
+
+        Размер выдачи фиксирован, общее число совпадений не считается.
+        """
+        documents = await self._request(
+            "search",
+            index=self.index_name,
+            query={
+                "match": {
+                    f"{field}.suggest": {"query": query, "operator": "and"}
+                }
+            },
+            sort=sort,
+            size=config.settings.suggest_size,
+            source_includes=source,
+            track_total_hits=False,
+        )
+        return [hit["_source"] for hit in documents["hits"]["hits"]]
+
 
 class FilmStorage(ABCStorage):
     """
@@ -33,6 +184,7 @@ class FilmStorage(ABCStorage):
     def __init__(self, es_client: AsyncElasticsearch):
         self.es_client = es_client
         self.index_name = config.settings.movies_es_index
+        self.breaker = get_circuit_breaker(self.index_name)
 
     @backoff.on_exception(
         backoff.expo,
@@ -40,11 +192,12 @@ class FilmStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
     async def get_by_id(self, uuid: UUID) -> Optional[Film]:
         with tracer.start_as_current_span("elasticsearch"):
             try:
-                film = await self.es_client.get(
-                    index=self.index_name, id=str(uuid)
+                film = await self._request(
+                    "get", index=self.index_name, id=str(uuid)
                 )
             except NotFoundError:
                 return None
@@ -56,57 +209,189 @@ class FilmStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
+    async def get_by_ids(self, uuids: list[UUID]) -> dict[str, Film]:
+        with tracer.start_as_current_span("elasticsearch"):
+            films = await self._request(
+                "mget",
+                index=self.index_name,
+                ids=[str(uuid) for uuid in uuids],
+            )
+            return {
+                film["_id"]: Film(**film["_source"])
+                for film in films["docs"]
+                if film.get("found")
+            }
+
+    @staticmethod
+    def _films_query(genre_uuid: UUID | None = None) -> dict:
+        query = {"bool": {"must": [{"match_all": {}}]}}
+        if genre_uuid:
+            query["bool"]["must"] += [
+                {
+                    "nested": {
+                        "path": config.settings.genres_es_index,
+                        "query": {
+                            "bool": {
+                                "must": [
+                                    {
+                                        "match": {
+                                            f"{config.settings.genres_es_index}.id": genre_uuid
+                                        },
+                                    }
+                                ]
+                            }
+                        },
+                    }
+                }
+            ]
+        return query
+
+    @staticmethod
+    def _facets_aggs() -> dict:
+        """Агрегации фасетов списка фильмов.
+
+        Счетчики жанров считаются по всему индексу (`global`), чтобы при
+        выбранном жанре оставались видны остальные; рейтинг и тип
+        считаются по отфильтрованному списку.
+        """
+        return {
+            "genres": {
+                "global": {},
+                "aggs": {
+                    "nested": {
+                        "nested": {"path": "genres"},
+                        "aggs": {
+                            "ids": {
+                                "terms": {
+                                    "field": "genres.id",
+                                    "size": config.settings.facets_size,
+                                },
+                                "aggs": {"genre": {"top_hits": {"size": 1}}},
+                            }
+                        },
+                    }
+                },
+            },
+            "ratings": {
+                "histogram": {
+                    "field": "imdb_rating",
+                    "interval": config.settings.facets_rating_interval,
+                    "min_doc_count": 1,
+                }
+            },
+            "types": {
+                "terms": {"field": "type", "size": config.settings.facets_size}
+            },
+        }
+
+    @staticmethod
+    def _parse_facets(aggregations: dict) -> FilmFacets:
+        interval = config.settings.facets_rating_interval
+        genres = aggregations["genres"]["nested"]["ids"]["buckets"]
+        return FilmFacets(
+            genres=[
+                GenreFacet(
+                    id=bucket["key"],
+                    name=bucket["genre"]["hits"]["hits"][0]["_source"]["name"],
+                    count=bucket["doc_count"],
+                )
+                for bucket in genres
+            ],
+            ratings=[
+                RatingFacet(
+                    rating_from=bucket["key"],
+                    rating_to=bucket["key"] + interval,
+                    count=bucket["doc_count"],
+                )
+                for bucket in aggregations["ratings"]["buckets"]
+            ],
+            types=[
+                TypeFacet(type=bucket["key"], count=bucket["doc_count"])
+                for bucket in aggregations["types"]["buckets"]
+            ],
+        )
+
+    @backoff.on_exception(
+        backoff.expo,
+        ConnectionError,
+        max_time=config.settings.backoff_time,
+        max_tries=config.settings.backoff_tries,
+    )
+    @circuit_breaker
     async def get_films(
         self,
         page_number: int,
         page_size: int,
         sort: Sort,
         genre_uuid: UUID | None = None,
-    ) -> tuple[int, list[Optional[Film]]]:
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[Film]], Optional[str]]:
         with tracer.start_as_current_span("elasticsearch"):
-            query = {"bool": {"must": [{"match_all": {}}]}}
-            query_sort = [{"imdb_rating": {"order": sort}}]
-            query_size = page_size
-            query_scroll = "1m"
-            if genre_uuid:
-                query["bool"]["must"] += [
-                    {
-                        "nested": {
-                            "path": config.settings.genres_es_index,
-                            "query": {
-                                "bool": {
-                                    "must": [
-                                        {
-                                            "match": {
-                                                f"{config.settings.genres_es_index}.id": genre_uuid
-                                            },
-                                        }
-                                    ]
-                                }
-                            },
-                        }
-                    }
-                ]
-            films = await self.es_client.search(
-                index=self.index_name,
-                query=query,
-                sort=query_sort,
-                size=query_size,
-                scroll=query_scroll,
+            query_sort = [
+                {"imdb_rating": {"order": sort}},
+                {"id": {"order": "asc"}},
+            ]
+            total_pages, films, next_cursor, _ = await self._search_page(
+                self._films_query(genre_uuid),
+                query_sort,
+                page_number,
+                page_size,
+                cursor,
             )
-
-            total_values = films["hits"]["total"]["value"]
-            total_pages = -(-total_values // page_size)
-
-            for _ in range(page_number - 1):
-                films = await self.es_client.scroll(
-                    scroll_id=films["_scroll_id"], scroll=query_scroll
-                )
-
             return (
                 total_pages,
-                [Film(**film["_source"]) for film in films["hits"]["hits"]],
+                [Film(**film) for film in films],
+                next_cursor,
+            )
+
+    @backoff.on_exception(
+        backoff.expo,
+        ConnectionError,
+        max_time=config.settings.backoff_time,
+        max_tries=config.settings.backoff_tries,
+    )
+    @circuit_breaker
+    async def get_films_with_facets(
+        self,
+        page_number: int,
+        page_size: int,
+        sort: Sort,
+        genre_uuid: UUID | None = None,
+        cursor: str | None = None,
+    ) -> tuple[tuple[int, list[Film], Optional[str]], FilmFacets]:
+        """Страница фильмов и фасеты одним запросом к ES."""
+        with tracer.start_as_current_span("elasticsearch"):
+            query_sort = [
+                {"imdb_rating": {"order": sort}},
+                {"id": {"order": "asc"}},
+            ]
+            (
+                total_pages,
+                films,
+                next_cursor,
+                aggregations,
+            ) = await self._search_page(
+                self._films_query(genre_uuid),
+                query_sort,
+                page_number,
+                page_size,
+                cursor,
+                aggs=self._facets_aggs(),
             )
+            page = (total_pages, [Film(**film) for film in films], next_cursor)
+            if not aggregations:
+                # Страница за пределами выдачи, фасеты считаются отдельно
+                aggregations = (
+                    await self._request(
+                        "search",
+                        index=self.index_name,
+                        query=self._films_query(genre_uuid),
+                        size=0,
+                        aggs=self._facets_aggs(),
+                    )
+                )["aggregations"]
+            return page, self._parse_facets(aggregations)
 
     @backoff.on_exception(
         backoff.expo,
@@ -114,13 +399,15 @@ class FilmStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
     async def search_films(
         self,
         page_number: int,
         page_size: int,
         query: str,
         sort: Sort,
-    ) -> tuple[int, list[Optional[Film]]]:
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[Film]], Optional[str]]:
         with tracer.start_as_current_span("elasticsearch"):
             query_query = {
                 "multi_match": {
@@ -128,29 +415,38 @@ class FilmStorage(ABCStorage):
                     "fields": ["title", "description"],
                 }
             }
-            query_sort = [{"imdb_rating": {"order": sort}}]
-            query_size = page_size
-            query_scroll = "1m"
-            films = await self.es_client.search(
-                index=self.index_name,
-                query=query_query,
-                sort=query_sort,
-                size=query_size,
-                scroll=query_scroll,
+            query_sort = [
+                {"imdb_rating": {"order": sort}},
+                {"id": {"order": "asc"}},
+            ]
+            total_pages, films, next_cursor, _ = await self._search_page(
+                query_query, query_sort, page_number, page_size, cursor
             )
-
-            total_values = films["hits"]["total"]["value"]
-            total_pages = -(-total_values // page_size)
-
-            for _ in range(page_number - 1):
-                films = await self.es_client.scroll(
-                    scroll_id=films["_scroll_id"], scroll=query_scroll
-                )
-
             return (
                 total_pages,
-                [Film(**film["_source"]) for film in films["hits"]["hits"]],
+                [Film(**film) for film in films],
+                next_cursor,
+            )
+
+    @backoff.on_exception(
+        backoff.expo,
+        ConnectionError,
+        max_time=config.settings.backoff_time,
+        max_tries=config.settings.backoff_tries,
+    )
+    @circuit_breaker
+    async def suggest_films(self, query: str) -> list[FilmSuggestion]:
+        with tracer.start_as_current_span("elasticsearch"):
+            films = await self._suggest(
+                "title",
+                query,
+                source=["id", "title"],
+                sort=[
+                    {"_score": {"order": "desc"}},
+                    {"imdb_rating": {"order": "desc"}},
+                ],
             )
+            return [FilmSuggestion(**film) for film in films]
 
 
 class GenreStorage(ABCStorage):
@@ -161,6 +457,7 @@ class GenreStorage(ABCStorage):
     def __init__(self, es_client: AsyncElasticsearch):
         self.es_client = es_client
         self.index_name = config.settings.genres_es_index
+        self.breaker = get_circuit_breaker(self.index_name)
 
     @backoff.on_exception(
         backoff.expo,
@@ -168,11 +465,12 @@ class GenreStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
     async def get_by_id(self, uuid: UUID) -> Optional[FilmGenre]:
         with tracer.start_as_current_span("elasticsearch"):
             try:
-                genre = await self.es_client.get(
-                    index=self.index_name, id=uuid
+                genre = await self._request(
+                    "get", index=self.index_name, id=uuid
                 )
             except NotFoundError:
                 return None
@@ -184,12 +482,13 @@ class GenreStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
     async def get_all_genres(self) -> list[Optional[FilmGenre]]:
         with tracer.start_as_current_span("elasticsearch"):
             query = {"match_all": {}}
             query_size = 1000
-            genres = await self.es_client.search(
-                index=self.index_name, query=query, size=query_size
+            genres = await self._request(
+                "search", index=self.index_name, query=query, size=query_size
             )
             return [
                 FilmGenre(**genre["_source"])
@@ -205,6 +504,7 @@ class PersonStorage(ABCStorage):
     def __init__(self, es_client: AsyncElasticsearch):
         self.es_client = es_client
         self.index_name = config.settings.persons_es_index
+        self.breaker = get_circuit_breaker(self.index_name)
 
     @backoff.on_exception(
         backoff.expo,
@@ -212,65 +512,22 @@ class PersonStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
     async def get_by_id(self, uuid: UUID) -> Optional[Person]:
         with tracer.start_as_current_span("elasticsearch"):
             try:
-                person = await self.es_client.get(
-                    index=self.index_name, id=uuid
+                person = await self._request(
+                    "get", index=self.index_name, id=str(uuid)
                 )
             except NotFoundError:
                 return None
 
-            query = {
-                "bool": {
-                    "should": [
-                        {
-                            "nested": {
-                                "path": "actors",
-                                "query": {
-                                    "bool": {
-                                        "must": [
-                                            {"match": {"actors.id": uuid}}
-                                        ]
-                                    }
-                                },
-                            }
-                        },
-                        {
-                            "nested": {
-                                "path": "directors",
-                                "query": {
-                                    "bool": {
-                                        "must": [
-                                            {"match": {"directors.id": uuid}}
-                                        ]
-                                    }
-                                },
-                            }
-                        },
-                        {
-                            "nested": {
-                                "path": "writers",
-                                "query": {
-                                    "bool": {
-                                        "must": [
-                                            {"match": {"writers.id": uuid}}
-                                        ]
-                                    }
-                                },
-                            }
-                        },
-                    ]
-                }
-            }
-            films = await self.es_client.search(
-                index=config.settings.movies_es_index, query=query
+            person = person["_source"]
+            films = await self._get_films(
+                [film["id"] for film in person.get("films", [])]
             )
             return Person(
-                **person["_source"],
-                films=[
-                    Film(**film["_source"]) for film in films["hits"]["hits"]
-                ],
+                id=person["id"], full_name=person["full_name"], films=films
             )
 
     @backoff.on_exception(
@@ -279,35 +536,91 @@ class PersonStorage(ABCStorage):
         max_time=config.settings.backoff_time,
         max_tries=config.settings.backoff_tries,
     )
+    @circuit_breaker
+    async def get_person_films(
+        self, uuid: UUID, page_number: int, page_size: int
+    ) -> Optional[tuple[int, list[Film]]]:
+        with tracer.start_as_current_span("elasticsearch"):
+            try:
+                person = await self._request(
+                    "get",
+                    index=self.index_name,
+                    id=str(uuid),
+                    source_includes=["films.id"],
+                )
+            except NotFoundError:
+                return None
+
+            film_ids = [
+                film["id"] for film in person["_source"].get("films", [])
+            ]
+            total_pages = -(-len(film_ids) // page_size)
+            offset = (page_number - 1) * page_size
+            films = await self._get_films(
+                film_ids[offset:offset + page_size]
+            )
+            return total_pages, films
+
+    async def _get_films(self, film_ids: list[str]) -> list[Film]:
+        if not film_ids:
+            return []
+        films = await self._request(
+            "mget", index=config.settings.movies_es_index, ids=film_ids
+        )
+        return [
+            Film(**film["_source"])
+            for film in films["docs"]
+            if film.get("found")
+        ]
+
+    @backoff.on_exception(
+        backoff.expo,
+        ConnectionError,
+        max_time=config.settings.backoff_time,
+        max_tries=config.settings.backoff_tries,
+    )
+    @circuit_breaker
     async def search_by_full_name(
-        self, page_number: int, page_size: int, query: str
-    ) -> tuple[int, list[Optional[FilmPerson]]]:
+        self,
+        page_number: int,
+        page_size: int,
+        query: str,
+        cursor: str | None = None,
+    ) -> tuple[int, list[Optional[FilmPerson]], Optional[str]]:
         with tracer.start_as_current_span("elasticsearch"):
             query_query = {"match": {"full_name": query}}
-            query_size = page_size
-            query_scroll = "1m"
-            persons = await self.es_client.search(
-                index=self.index_name,
-                query=query_query,
-                size=query_size,
-                scroll=query_scroll,
+            query_sort = [
+                {"_score": {"order": "desc"}},
+                {"id": {"order": "asc"}},
+            ]
+            total_pages, persons, next_cursor, _ = await self._search_page(
+                query_query, query_sort, page_number, page_size, cursor
             )
-
-            total_values = persons["hits"]["total"]["value"]
-            total_pages = -(-total_values // page_size)
-
-            for _ in range(page_number - 1):
-                persons = await self.es_client.scroll(
-                    scroll_id=persons["_scroll_id"], scroll=query_scroll
-                )
-
             return (
                 total_pages,
-                [
-                    FilmPerson(**person["_source"])
-                    for person in persons["hits"]["hits"]
+                [FilmPerson(**person) for person in persons],
+                next_cursor,
+            )
+
+    @backoff.on_exception(
+        backoff.expo,
+        ConnectionError,
+        max_time=config.settings.backoff_time,
+        max_tries=config.settings.backoff_tries,
+    )
+    @circuit_breaker
+    async def suggest_persons(self, query: str) -> list[FilmPerson]:
+        with tracer.start_as_current_span("elasticsearch"):
+            persons = await self._suggest(
+                "full_name",
+                query,
+                source=["id", "full_name"],
+                sort=[
+                    {"_score": {"order": "desc"}},
+                    {"full_name.raw": {"order": "asc"}},
                 ],
             )
+            return [FilmPerson(**person) for person in persons]
 
 
 @lru_cache()
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+import time
+from typing import Any, Optional
+
+from core.metrics import CACHE_REQUESTS
+
+local: Optional["LocalCache"] = None
+
+
+class LocalCache:
+    """
+    Ограниченный по числу записей и объему LRU/TTL кэш объектов
+    в памяти воркера
+    """
+
+    def __init__(self, max_items: int, max_bytes: int, lifetime: int):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.lifetime = lifetime
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            CACHE_REQUESTS.labels("local", "miss").inc()
+            return None
+
+        expires, _, value = item
+        if expires < time.monotonic():
+            self._pop(key)
+            self.misses += 1
+            CACHE_REQUESTS.labels("local", "miss").inc()
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        CACHE_REQUESTS.labels("local", "hit").inc()
+        return value
+
+    def put(
+        self, key: str, value: Any, size: int, ex: int | None = None
+    ) -> None:
+        """Сохранение объекта.
+
+        `size` - размер сериализованного значения, по нему ведется учет
+        занятой памяти. Объекты крупнее лимита не кэшируются.
+        """
+        self._pop(key)
+        if size > self.max_bytes:
+            return
+
+        lifetime = min(ex, self.lifetime) if ex else self.lifetime
+        self._items[key] = (time.monotonic() + lifetime, size, value)
+        self.size += size
+        while len(self._items) > self.max_items or self.size > self.max_bytes:
+            self._pop(next(iter(self._items)))
+
+    def invalidate(self, key: str | None = None) -> None:
+        if key is None:
+            self._items.clear()
+            self.size = 0
+        else:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        if item := self._items.pop(key, None):
+            self.size -= item[1]
@@ -1,14 +1,79 @@
 from abc import ABC, abstractmethod
+import asyncio
+from contextlib import contextmanager, suppress
 from functools import lru_cache
-from typing import Any, Optional
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from uuid import uuid4
 
-from opentelemetry import trace
+from loguru import logger
+from pydantic import TypeAdapter
 from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, LockError, TimeoutError
 
-tracer = trace.get_tracer(__name__)
+from core.config import settings
+from core.degraded import mark_degraded
+from core.metrics import CACHE_REQUESTS, REDIS_LATENCY
+from core.tracing import get_tracer
+from storages import local_cache
+from storages.circuit_breaker import StorageUnavailableError
+from storages.local_cache import LocalCache
+from storages.single_flight import SingleFlight
+
+tracer = get_tracer(__name__)
 
 rds: Optional["RedisCache"] = None
 
+GENERATION_KEY = "generation:{index}"
+STALE_KEY = "stale:{key}"
+LOCK_KEY = "lock:{key}"
+ETAG_KEY = "etag:{key}"
+
+WORKER_ID = uuid4().hex
+
+
+@contextmanager
+def redis_call(command: str) -> Iterator[None]:
+    with tracer.start_as_current_span("redis"):
+        with REDIS_LATENCY.labels(command).time():
+            yield
+
+
+@lru_cache()
+def get_type_adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def make_etag(value: bytes) -> str:
+    return f'"{hashlib.blake2b(value, digest_size=16).hexdigest()}"'
+
+
+def object_etag(value: Any, type_: Any) -> str:
+    """ETag объекта, совпадающий с ETag его записи в кэше."""
+    return make_etag(get_type_adapter(type_).dump_json(value))
+
+
+def make_cache_key(prefix: str, generation: int, **params: Any) -> str:
+    """Ключ кэша результата запроса.
+
+    Параметры нормализуются (регистр и пробелы поискового запроса, uuid и
+    enum в строки), чтобы одинаковые по смыслу запросы попадали в один ключ.
+    Поколение индекса в ключе делает устаревшими записи после загрузки
+    новых документов ETL-процессом.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name == "query":
+            value = " ".join(value.lower().split())
+        elif value is not None and not isinstance(value, (int, float, str)):
+            value = str(getattr(value, "value", value))
+        normalized[name] = value
+    digest = hashlib.sha1(
+        json.dumps(normalized, sort_keys=True).encode()
+    ).hexdigest()
+    return f"{prefix}:{generation}:{digest}"
+
 
 class ABCCache(ABC):
     """
@@ -20,9 +85,24 @@ class ABCCache(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def put(self, key: str, value: str, ex: int | None = None) -> None:
+    async def put(
+        self, key: str, value: str | bytes, ex: int | None = None
+    ) -> None:
         raise NotImplementedError
 
+    async def get_object(self, key: str, type_: Any) -> Any:
+        if value := await self.get(key):
+            return get_type_adapter(type_).validate_json(value)
+        return None
+
+    async def put_object(
+        self, key: str, value: Any, type_: Any, ex: int | None = None
+    ) -> None:
+        await self.put(key, get_type_adapter(type_).dump_json(value), ex=ex)
+
+    async def get_generation(self, index: str) -> int:
+        return int(await self.get(GENERATION_KEY.format(index=index)) or 0)
+
 
 class RedisCache(ABCCache):
     """
@@ -31,16 +111,310 @@ class RedisCache(ABCCache):
 
     def __init__(self, redis_client: Redis):
         self.redis_client: Redis = redis_client
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
 
     async def get(self, key: str) -> Any:
-        with tracer.start_as_current_span("redis"):
-            return await self.redis_client.get(key)
+        with redis_call("get"):
+            value = await self.redis_client.get(key)
+        if value is None:
+            self.misses += 1
+            CACHE_REQUESTS.labels("redis", "miss").inc()
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.labels("redis", "hit").inc()
+        return value
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        with redis_call("mget"):
+            values = await self.redis_client.mget(keys)
+        missed = values.count(None)
+        self.misses += missed
+        self.hits += len(values) - missed
+        CACHE_REQUESTS.labels("redis", "miss").inc(missed)
+        CACHE_REQUESTS.labels("redis", "hit").inc(len(values) - missed)
+        return values
 
-    async def put(self, key: str, value: str, ex: int | None = None) -> None:
-        with tracer.start_as_current_span("redis"):
+    async def put(
+        self, key: str, value: str | bytes, ex: int | None = None
+    ) -> None:
+        with redis_call("set"):
             await self.redis_client.set(key, value, ex=ex)
 
+    async def put_object(
+        self, key: str, value: Any, type_: Any, ex: int | None = None
+    ) -> None:
+        await self.put_objects({key: value}, type_, ex=ex)
+
+    async def get_objects(self, keys: list[str], type_: Any) -> list[Any]:
+        """Получение объектов одним запросом MGET, `None` для промахов."""
+        adapter = get_type_adapter(type_)
+        return [
+            adapter.validate_json(value) if value else None
+            for value in await self.get_many(keys)
+        ]
+
+    async def put_objects(
+        self, values: dict[str, Any], type_: Any, ex: int | None = None
+    ) -> None:
+        adapter = get_type_adapter(type_)
+        await self._put_with_stale(
+            {key: adapter.dump_json(value) for key, value in values.items()},
+            ex=ex,
+        )
+
+    async def get_etag(self, key: str) -> Optional[str]:
+        """ETag записи кэша без чтения и разбора самой записи."""
+        with redis_call("get"):
+            etag = await self.redis_client.get(ETAG_KEY.format(key=key))
+        return etag.decode() if etag else None
+
+    async def get_stale_object(
+        self, key: str, type_: Any, max_expired: int | None = None
+    ) -> Any:
+        """Получение копии записи, пережившей истечение основного ключа.
+
+        `max_expired` ограничивает время (в секундах), прошедшее
+        с истечения основного ключа.
+        """
+        stale_key = STALE_KEY.format(key=key)
+        with redis_call("pipeline"):
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(stale_key)
+                pipe.ttl(stale_key)
+                value, ttl = await pipe.execute()
+        if value is None:
+            return None
+        expired_for = settings.cache_stale_lifetime - ttl
+        if max_expired is not None and expired_for > max_expired:
+            return None
+        return get_type_adapter(type_).validate_json(value)
+
+    async def get_stale_objects(
+        self, keys: list[str], type_: Any
+    ) -> list[Any]:
+        """Получение копий записей одним MGET, `None` для отсутствующих."""
+        adapter = get_type_adapter(type_)
+        with redis_call("mget"):
+            values = await self.redis_client.mget(
+                [STALE_KEY.format(key=key) for key in keys]
+            )
+        return [
+            adapter.validate_json(value) if value else None
+            for value in values
+        ]
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        type_: Any,
+        fetch: Callable[[], Awaitable[Any]],
+        ex: int | None = None,
+    ) -> Any:
+        """Получение объекта из кэша с загрузкой из хранилища при промахе.
+
+        Одновременные промахи по ключу объединяются в один запрос
+        к хранилищу. Только что истекшая запись отдается сразу,
+        а обновляется в фоне. При недоступном хранилище отдается
+        последняя известная копия, а ответ помечается как деградированный.
+        """
+        if (value := await self.get_object(key, type_)) is not None:
+            return value
+
+        async def refresh() -> Any:
+            return await self._fetch(key, type_, fetch, ex)
+
+        async def refresh_in_background() -> Any:
+            # Результат фонового обновления никто не ожидает
+            try:
+                return await refresh()
+            except Exception as error:
+                logger.warning(
+                    f"Background refresh of '{key}' failed: {error}"
+                )
+                raise
+
+        stale = await self.get_stale_object(
+            key, type_, max_expired=settings.cache_swr_window
+        )
+        if stale is not None:
+            self.flight.start(key, refresh_in_background)
+            return stale
+        try:
+            return await self.flight.do(key, refresh)
+        except StorageUnavailableError as error:
+            stale = await self.get_stale_object(key, type_)
+            if stale is None:
+                raise
+            mark_degraded(error.storage)
+            return stale
+
+    async def _fetch(
+        self,
+        key: str,
+        type_: Any,
+        fetch: Callable[[], Awaitable[Any]],
+        ex: int | None = None,
+    ) -> Any:
+        if not settings.cache_lock_enabled:
+            value = await fetch()
+            if value is not None:
+                await self.put_object(key, value, type_, ex=ex)
+            return value
+
+        lock = self.redis_client.lock(
+            LOCK_KEY.format(key=key),
+            timeout=settings.cache_lock_timeout,
+            blocking_timeout=settings.cache_lock_wait,
+        )
+        acquired = await lock.acquire()
+        try:
+            # Пока ожидали блокировку, запись мог загрузить другой воркер
+            if (value := await self.get_object(key, type_)) is not None:
+                return value
+            value = await fetch()
+            if value is not None:
+                await self.put_object(key, value, type_, ex=ex)
+            return value
+        finally:
+            if acquired:
+                with suppress(LockError):
+                    await lock.release()
+
+    async def _put_with_stale(
+        self, values: dict[str, bytes], ex: int | None = None
+    ) -> None:
+        """Запись значений вместе с устаревающими копиями и ETag.
+
+        ETag живет столько же, сколько сама запись: 304 по нему отдается
+        до чтения кэша, и после истечения записи клиент должен получить
+        обновленные данные, а не 304 по устаревшей копии.
+        """
+        stale_ex = ex + settings.cache_stale_lifetime if ex else None
+        with redis_call("pipeline"):
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, value, ex=ex)
+                    if ex:
+                        pipe.set(STALE_KEY.format(key=key), value, ex=stale_ex)
+                    pipe.set(ETAG_KEY.format(key=key), make_etag(value), ex=ex)
+                await pipe.execute()
+
+
+class TieredCache(RedisCache):
+    """
+    Двухуровневый кэш: провалидированные объекты в памяти воркера
+    перед Redis
+    """
+
+    def __init__(self, redis_client: Redis, local_cache: LocalCache):
+        super().__init__(redis_client)
+        self.local_cache = local_cache
+
+    async def get_object(self, key: str, type_: Any) -> Any:
+        if (value := self.local_cache.get(key)) is not None:
+            return value
+
+        if raw_value := await self.get(key):
+            value = get_type_adapter(type_).validate_json(raw_value)
+            self.local_cache.put(key, value, len(raw_value))
+            return value
+        return None
+
+    async def get_objects(self, keys: list[str], type_: Any) -> list[Any]:
+        values = [self.local_cache.get(key) for key in keys]
+        missed = [key for key, value in zip(keys, values) if value is None]
+        if not missed:
+            return values
+
+        adapter = get_type_adapter(type_)
+        raw_values = dict(zip(missed, await self.get_many(missed)))
+        for position, key in enumerate(keys):
+            if values[position] is None and (raw_value := raw_values[key]):
+                values[position] = adapter.validate_json(raw_value)
+                self.local_cache.put(key, values[position], len(raw_value))
+        return values
+
+    async def put_objects(
+        self, values: dict[str, Any], type_: Any, ex: int | None = None
+    ) -> None:
+        adapter = get_type_adapter(type_)
+        raw_values = {
+            key: adapter.dump_json(value) for key, value in values.items()
+        }
+        await self._put_with_stale(raw_values, ex=ex)
+        for key, value in values.items():
+            self.local_cache.put(key, value, len(raw_values[key]), ex=ex)
+            etag_key = ETAG_KEY.format(key=key)
+            self.local_cache.put(
+                etag_key, make_etag(raw_values[key]), len(etag_key), ex=ex
+            )
+
+        with redis_call("publish"):
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key in values:
+                    pipe.publish(
+                        settings.cache_invalidation_channel,
+                        f"{WORKER_ID} {key}",
+                    )
+                await pipe.execute()
+
+    async def get_etag(self, key: str) -> Optional[str]:
+        etag_key = ETAG_KEY.format(key=key)
+        if (etag := self.local_cache.get(etag_key)) is not None:
+            return etag
+
+        if (etag := await super().get_etag(key)) is not None:
+            self.local_cache.put(etag_key, etag, len(etag_key))
+        return etag
+
+    async def get_generation(self, index: str) -> int:
+        key = GENERATION_KEY.format(index=index)
+        if (generation := self.local_cache.get(key)) is not None:
+            return generation
+
+        generation = int(await self.get(key) or 0)
+        self.local_cache.put(key, generation, len(key))
+        return generation
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "local": {
+                "hits": self.local_cache.hits,
+                "misses": self.local_cache.misses,
+                "items": len(self.local_cache),
+                "bytes": self.local_cache.size,
+            },
+            "redis": {"hits": self.hits, "misses": self.misses},
+        }
+
+
+async def listen_invalidations(
+    redis_client: Redis, local_cache: LocalCache
+) -> None:
+    """Сброс записей локального кэша по сообщениям других воркеров и ETL.
+
+    При потере соединения локальный кэш очищается целиком, так как
+    сообщения за время разрыва могли быть пропущены.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(settings.cache_invalidation_channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    origin, key = message["data"].decode().split(" ", 1)
+                    if origin != WORKER_ID:
+                        local_cache.invalidate(key)
+                        local_cache.invalidate(ETAG_KEY.format(key=key))
+        except (ConnectionError, TimeoutError) as error:
+            logger.error(f"Cache invalidation listener failed: {error}")
+            local_cache.invalidate()
+            await asyncio.sleep(1)
+
 
 @lru_cache()
-def get_cache() -> RedisCache:
-    return RedisCache(rds)
+def get_cache() -> TieredCache:
+    return TieredCache(rds, local_cache.local)
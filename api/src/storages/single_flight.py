@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+
+class SingleFlight:
+    """
+    Объединение одновременных запросов по одному ключу: в воркере
+    выполняется только один запрос, остальные ожидают его результат
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    def start(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Task:
+        """Запуск запроса, если по ключу еще нет выполняющегося."""
+        if (task := self._calls.get(key)) is None:
+            task = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self._calls[key] = task
+        return task
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Ожидание результата общего запроса.
+
+        Отмена одного из ожидающих (например, при обрыве соединения
+        клиентом) не отменяет запрос для остальных.
+        """
+        return await asyncio.shield(self.start(key, func))
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Ошибку получают и обрабатывают ожидающие вызовы `do`; здесь она
+        # только забирается из задачи, чтобы asyncio не предупреждал
+        # о необработанном исключении, когда ожидающих не осталось
+        if not task.cancelled() and (error := task.exception()):
+            logger.debug(f"Single flight call '{key}' failed: {error}")
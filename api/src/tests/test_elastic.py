@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from storages.elastic import (
+    FilmStorage,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+
+SORT = [{"imdb_rating": {"order": "desc"}}, {"id": {"order": "asc"}}]
+
+
+class FakeElasticsearch:
+    """Индекс из `total` документов с сортировкой по порядковому номеру."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.searches = []
+
+    async def search(self, **kwargs) -> dict:
+        self.searches.append(kwargs)
+        start = kwargs["search_after"][0] if kwargs["search_after"] else 0
+        start += kwargs.get("from_") or 0
+        end = min(start + kwargs["size"], self.total)
+        positions = range(start + 1, end + 1)
+        return {
+            "hits": {
+                "total": {"value": self.total},
+                "hits": [
+                    {"_source": {"position": p}, "sort": [p, "id"]}
+                    for p in positions
+                ],
+            }
+        }
+
+    async def count(self, **kwargs) -> dict:
+        return {"count": self.total}
+
+
+def test_decode_cursor_round_trip():
+    assert decode_cursor(encode_cursor([7.5, "id"]), 2) == [7.5, "id"]
+
+
+@pytest.mark.parametrize("sort_values", [[7.5], [7.5, "id", 1], []])
+def test_decode_cursor_rejects_wrong_arity(sort_values):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(sort_values), 2)
+
+
+@pytest.mark.parametrize(
+    "sort_values",
+    [[7.5, None], [{"a": 1}, "id"], [[1], "id"], [True, "id"], "id"],
+)
+def test_decode_cursor_rejects_non_scalar_values(sort_values):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(sort_values), 2)
+
+
+def test_deep_page_sends_search_after_without_from():
+    es = FakeElasticsearch(total=500_000)
+    total_pages, hits, _, _ = asyncio.run(
+        FilmStorage(es)._search_page({}, SORT, 301, 50)
+    )
+    assert [search["size"] for search in es.searches] == [10_000, 5_000, 50]
+    assert es.searches[-1]["from_"] is None
+    assert es.searches[-1]["track_total_hits"] is True
+    assert hits[0]["position"] == 15_001
+    assert total_pages == 10_000
+
+
+def test_deep_page_past_the_end_reports_total():
+    es = FakeElasticsearch(total=12_345)
+    total_pages, hits, next_cursor, _ = asyncio.run(
+        FilmStorage(es)._search_page({}, SORT, 400, 50)
+    )
+    assert (total_pages, hits, next_cursor) == (247, [], None)
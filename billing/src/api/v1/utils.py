@@ -8,7 +8,8 @@ from fastapi.security import HTTPBearer
 from jose import jwt, JWTError
 from loguru import logger
 
-from core.config import PUBLIC_KEY
+from core.config import PUBLIC_KEY, settings
+from core.tokens import VerifiedTokenCache
 from schemas.orders import (OrderEventSchema, OrderEventTypeEnum,
                             OrderStatusEnum, PaymentSchema,
                             UpdateOrderSchemaAfterWebhook)
@@ -17,15 +18,17 @@ from storages.storage import storage
 
 YANDEX_JWK_ENDPOINT = "https://sandbox.pay.yandex.ru/api/jwks"
 
+token_cache = VerifiedTokenCache(
+    PUBLIC_KEY,
+    audience="BILLING",
+    max_size=settings.jwt_cache_max_size,
+    max_lifetime=settings.jwt_cache_max_lifetime,
+)
+
 
 def decode_token(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(
-            token,
-            PUBLIC_KEY,
-            algorithms=["RS256"],
-            audience="BILLING",
-        )
+        payload = token_cache.decode(token)
     except Exception:
         return None
 
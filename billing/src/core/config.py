@@ -23,6 +23,9 @@ class Settings(BaseSettings):
     sentry_dsn: Optional[str] = Field(None, alias="SENTRY_DSN")
     auth_api_url: str = Field("http://127.0.0.1:5020/api/v1", alias="AUTH_API_URL")
 
+    jwt_cache_max_size: int = Field(10000, alias="JWT_CACHE_MAX_SIZE")
+    jwt_cache_max_lifetime: int = Field(3600, alias="JWT_CACHE_MAX_LIFETIME")
+
     limiter_times: int = Field(5, alias="LIMITER_TIMES")
     limiter_seconds: int = Field(1, alias="LIMITER_SECONDS")
 
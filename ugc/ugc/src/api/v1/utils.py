@@ -4,16 +4,23 @@ from typing import Type
 import uuid
 
 from flask import abort, g, jsonify, make_response, request
-from jose import jwt
 from pydantic import ValidationError
 
 from buses.bus import get_eventbus
 from core.config import settings
 from core.loggers import logger
+from core.tokens import VerifiedTokenCache
 from schemas.entity import BaseEvent
 
 eventbus = get_eventbus()
 
+token_cache = VerifiedTokenCache(
+    settings.public_key,
+    audience=settings.app_name,
+    max_size=settings.jwt_cache_max_size,
+    max_lifetime=settings.jwt_cache_max_lifetime,
+)
+
 
 def exception_handler(func):
     @wraps(func)
@@ -43,12 +50,7 @@ def validate_request_headers(func):
         g.token = bearer_token.replace("Bearer ", "", 1)
 
         try:
-            g.token_payload = jwt.decode(
-                g.token,
-                settings.public_key,
-                algorithms=["RS256"],
-                audience=settings.app_name,
-            )
+            g.token_payload = token_cache.decode(g.token)
         except Exception:
             return jsonify(unauthorized_error), HTTPStatus.UNAUTHORIZED
 
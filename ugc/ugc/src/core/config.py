@@ -22,6 +22,9 @@ class Settings(BaseSettings):
     app_name: str = Field("UGC", alias="APP_NAME")
     api_v1_prefix: str = Field("/api/v1", alias="API_V1_PREFIX")
 
+    jwt_cache_max_size: int = Field(10000, alias="JWT_CACHE_MAX_SIZE")
+    jwt_cache_max_lifetime: int = Field(3600, alias="JWT_CACHE_MAX_LIFETIME")
+
     kafka_dsn: str = Field("localhost:9092", alias="KAFKA_CLUSTER")
     rabbit_dsn: str = Field("localhost:5672", alias="RABBIT_CLUSTER")
     mongo_dsn: str = Field("localhost:27017", alias="MONGO_CLUSTER")
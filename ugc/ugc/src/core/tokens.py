@@ -0,0 +1,66 @@
+from collections import OrderedDict
+import hashlib
+from threading import Lock
+import time
+
+from jose import jwk, jwt
+
+
+class VerifiedTokenCache:
+    """
+    Кэш проверенных JWT.
+
+    Публичный ключ разбирается один раз при создании, повторная проверка
+    подписи уже проверенного токена не выполняется до истечения его `exp`
+    (но не дольше `max_lifetime`). Токены хранятся по sha256-хэшу,
+    число записей ограничено `max_size`, вытесняются давно не
+    использованные.
+    """
+
+    def __init__(
+        self,
+        public_key: str,
+        audience: str,
+        algorithm: str = "RS256",
+        max_size: int = 10000,
+        max_lifetime: int = 3600,
+    ):
+        self.key = jwk.construct(public_key, algorithm)
+        self.audience = audience
+        self.algorithm = algorithm
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self._tokens: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+
+    def decode(self, token: str) -> dict:
+        """Проверка и декодирование токена.
+
+        Ошибки проверки пробрасываются как в `jose.jwt.decode`,
+        не прошедшие проверку токены не кэшируются.
+        """
+        token_hash = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            if cached := self._tokens.get(token_hash):
+                expires, payload = cached
+                if expires > now:
+                    self._tokens.move_to_end(token_hash)
+                    return dict(payload)
+                del self._tokens[token_hash]
+
+        payload = jwt.decode(
+            token,
+            self.key,
+            algorithms=[self.algorithm],
+            audience=self.audience,
+        )
+        expires = min(
+            payload.get("exp", now + self.max_lifetime),
+            now + self.max_lifetime,
+        )
+        with self._lock:
+            self._tokens[token_hash] = (expires, payload)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+        return dict(payload)